@@ -9,9 +9,15 @@ from fastapi.responses import JSONResponse
 try:
     from constants import APP_NAME, BRIDGE_HOST, BRIDGE_PORT, MAX_REPAIR_ATTEMPTS, SECONDS_PER_MINUTE
     from logger_config import logger
-    from models import ArrangeRequest, EnhanceRequest, GenerateRequest
+    from models import ArrangeRequest, EnhanceRequest, GenerateRequest, MusicInfo, TimeWindow
     from profile_utils import deep_merge, load_profile, resolve_preset
-    from prompt_builder import build_arrange_plan_prompt, build_chat_messages, build_plan_prompt, build_prompt
+    from prompt_builder import (
+        build_arrange_plan_prompt,
+        build_chat_messages,
+        build_plan_prompt,
+        build_prompt,
+        join_prompt_segments,
+    )
     from prompt_builder_common import extract_role_from_plan
     from llm_client import call_llm, parse_llm_json, resolve_model
     from prompt_enhancer import ENHANCER_SYSTEM_PROMPT, build_enhancer_prompt, extract_enhanced_prompt
@@ -35,9 +41,15 @@ try:
 except ImportError:
     from .constants import APP_NAME, BRIDGE_HOST, BRIDGE_PORT, MAX_REPAIR_ATTEMPTS, SECONDS_PER_MINUTE
     from .logger_config import logger
-    from .models import ArrangeRequest, EnhanceRequest, GenerateRequest
+    from .models import ArrangeRequest, EnhanceRequest, GenerateRequest, MusicInfo, TimeWindow
     from .profile_utils import deep_merge, load_profile, resolve_preset
-    from .prompt_builder import build_arrange_plan_prompt, build_chat_messages, build_plan_prompt, build_prompt
+    from .prompt_builder import (
+        build_arrange_plan_prompt,
+        build_chat_messages,
+        build_plan_prompt,
+        build_prompt,
+        join_prompt_segments,
+    )
     from .prompt_builder_common import extract_role_from_plan
     from .llm_client import call_llm, parse_llm_json, resolve_model
     from .prompt_enhancer import ENHANCER_SYSTEM_PROMPT, build_enhancer_prompt, extract_enhanced_prompt
@@ -62,7 +74,7 @@ except ImportError:
 app = FastAPI(title=APP_NAME)
 
 
-def calculate_length_q(time_window, music_info) -> float:
+def calculate_length_q(time_window: TimeWindow, music_info: MusicInfo) -> float:
     length_sec = time_window.end_sec - time_window.start_sec
     
     if time_window.length_bars is not None:
@@ -339,10 +351,7 @@ def attempt_schema_repair(
     if not errors:
         return parsed
     for attempt in range(max_attempts):
-        repair_messages = [
-            {"role": "system", "content": SCHEMA_REPAIR_SYSTEM_PROMPT},
-            {"role": "user", "content": build_schema_repair_prompt(parsed, profile, errors)},
-        ]
+        repair_messages = build_chat_messages(SCHEMA_REPAIR_SYSTEM_PROMPT, build_schema_repair_prompt(parsed, profile, errors))
         content = call_llm(provider, model_name, base_url, temperature, repair_messages, api_key)
         try:
             candidate = parse_llm_json(content)
@@ -374,8 +383,8 @@ def generate(request: GenerateRequest) -> JSONResponse:
     preset_name, preset_settings = resolve_preset(profile, request.target.preset_name)
     length_q = calculate_length_q(request.time, request.music)
 
-    system_prompt, user_prompt = build_prompt(request, profile, preset_name, preset_settings, length_q)
-    messages = build_chat_messages(system_prompt, user_prompt)
+    system_prompt, user_prompt_segments = build_prompt(request, profile, preset_name, preset_settings, length_q)
+    messages = build_chat_messages(system_prompt, user_prompt_segments, use_cache=True)
 
     provider, model_name, base_url, temperature, api_key = resolve_model(request, profile)
 
@@ -397,7 +406,7 @@ def generate(request: GenerateRequest) -> JSONResponse:
             request.generation_type,
             request.generation_style,
         )
-    logger.info("User prompt to LLM:\n%s", user_prompt)
+    logger.info("User prompt to LLM:\n%s", join_prompt_segments(user_prompt_segments))
 
     content = call_llm(provider, model_name, base_url, temperature, messages, api_key)
     logger.info("LLM response received: %d chars", len(content))
@@ -409,10 +418,7 @@ def generate(request: GenerateRequest) -> JSONResponse:
         logger.warning("LLM JSON parse failed, starting repair attempts")
         for attempt in range(MAX_REPAIR_ATTEMPTS):
             logger.info("Repair attempt %d/%d", attempt + 1, MAX_REPAIR_ATTEMPTS)
-            repair_messages = [
-                {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
-                {"role": "user", "content": content},
-            ]
+            repair_messages = build_chat_messages(REPAIR_SYSTEM_PROMPT, content)
             content = call_llm(provider, model_name, base_url, temperature, repair_messages, api_key)
             logger.info("Repair response received: %d chars", len(content))
             logger.info("Repair response preview: %s", summarize_text(content))
@@ -552,10 +558,7 @@ def plan(request: GenerateRequest) -> JSONResponse:
         logger.warning("LLM plan JSON parse failed, starting repair attempts")
         for attempt in range(MAX_REPAIR_ATTEMPTS):
             logger.info("Plan repair attempt %d/%d", attempt + 1, MAX_REPAIR_ATTEMPTS)
-            repair_messages = [
-                {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
-                {"role": "user", "content": content},
-            ]
+            repair_messages = build_chat_messages(REPAIR_SYSTEM_PROMPT, content)
             content = call_llm(provider, model_name, base_url, temperature, repair_messages, api_key)
             logger.info("Plan repair response received: %d chars", len(content))
             logger.info("Plan repair response preview: %s", summarize_text(content))
@@ -638,10 +641,7 @@ def arrange_plan(request: ArrangeRequest) -> JSONResponse:
         logger.warning("LLM arrange plan JSON parse failed, starting repair attempts")
         for attempt in range(MAX_REPAIR_ATTEMPTS):
             logger.info("Arrange plan repair attempt %d/%d", attempt + 1, MAX_REPAIR_ATTEMPTS)
-            repair_messages = [
-                {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
-                {"role": "user", "content": content},
-            ]
+            repair_messages = build_chat_messages(REPAIR_SYSTEM_PROMPT, content)
             content = call_llm(provider, model_name, base_url, float(temperature), repair_messages, api_key)
             logger.info("Arrange plan repair response received: %d chars", len(content))
             try:
@@ -668,7 +668,8 @@ def arrange_plan(request: ArrangeRequest) -> JSONResponse:
 
 @app.post("/enhance")
 def enhance(request: EnhanceRequest) -> JSONResponse:
-    if not request.user_prompt or not request.user_prompt.strip():
+    user_prompt_text = (request.user_prompt or "").strip()
+    if not user_prompt_text:
         raise HTTPException(status_code=400, detail="User prompt is required")
 
     instruments_data = [
@@ -686,7 +687,7 @@ def enhance(request: EnhanceRequest) -> JSONResponse:
         context_data = {"context_notes": request.context_notes}
 
     user_prompt = build_enhancer_prompt(
-        user_prompt=request.user_prompt,
+        user_prompt=user_prompt_text,
         instruments=instruments_data,
         key=request.key,
         bpm=request.bpm,
@@ -696,10 +697,7 @@ def enhance(request: EnhanceRequest) -> JSONResponse:
         context=context_data,
     )
 
-    messages = [
-        {"role": "system", "content": ENHANCER_SYSTEM_PROMPT},
-        {"role": "user", "content": user_prompt},
-    ]
+    messages = build_chat_messages(ENHANCER_SYSTEM_PROMPT, user_prompt)
 
     model_info = request.model
     provider = model_info.provider if model_info else "lmstudio"
@@ -17,6 +17,9 @@ DEFAULT_TEMPERATURE = 0.7
 HTTP_TIMEOUT_SEC = 300.0
 LLM_RETRY_ATTEMPTS = 3
 LLM_RETRY_BACKOFF_SEC = 1.0
+OPENROUTER_PROMPT_CACHE = True
+LLM_RESPONSE_CACHE_LIMIT = 32
+LLM_RESPONSE_CACHE_TTL_SEC = 600.0
 
 BRIDGE_HOST = "127.0.0.1"
 BRIDGE_PORT = 8000
@@ -65,7 +68,7 @@ ARTICULATION_PRE_ROLL_Q = 0.01
 DEFAULT_PROMPT_PITCH_LOW = 48
 DEFAULT_PROMPT_PITCH_HIGH = 72
 PROMPT_PITCH_PREVIEW_LIMIT = 20
-CUSTOM_CURVE_EXCLUSIONS = {"dynamics", "expression"}
+CUSTOM_CURVE_EXCLUSIONS = frozenset({"dynamics", "expression"})
 
 CONTINUATION_MODE_CONTINUE = "continue"
 CONTINUATION_MODE_FINISH = "finish"
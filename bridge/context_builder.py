@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 try:
@@ -188,6 +189,10 @@ NOTE_CONTEXT_PREVIEW_LIMIT = 2000
 ARTICULATION_CHANGE_PREVIEW_LIMIT = 300
 SIMPLIFIED_MIDI_MAP_LIMIT = 600
 HANDOFF_SUGGESTION_MAX_LEN = 1000
+SKETCH_CHORD_MAP_TABLE_HEADER = "\n".join([
+    "```",
+    "time_q | bar.beat | chord | roman | chord_tones (pitch classes)",
+])
 CC_LABELS = {
     1: "Dynamics",
     11: "Expression",
@@ -201,6 +206,8 @@ FREQUENCY_RANGES = {
     "high": (84, 127),
 }
 
+QUARTERS_PER_BAR_CACHE_SIZE = 32
+
 RHYTHMIC_FEEL_THRESHOLDS = {
     "sustained": 2.0,
     "sparse": 0.5,
@@ -217,6 +224,7 @@ def parse_time_sig(time_sig: str) -> Tuple[int, int]:
         return 4, 4
 
 
+@lru_cache(maxsize=QUARTERS_PER_BAR_CACHE_SIZE)
 def get_quarters_per_bar(time_sig: str) -> float:
     num, denom = parse_time_sig(time_sig)
     return num * (4.0 / denom)
@@ -304,7 +312,7 @@ def build_chord_map_from_sketch(
 
     chord_segments = extract_chords_lilchord_style(notes)
 
-    chord_entries: List[Dict[str, Any]] = []
+    chord_entries: List[Tuple[float, str, int, int, List[int], List[int]]] = []
     chord_roots: List[int] = []
 
     for seg in chord_segments:
@@ -321,37 +329,17 @@ def build_chord_map_from_sketch(
         if chord_name.endswith("note") and len({p % 12 for p in chord_pitches}) <= 1:
             continue
 
-        bass_pc = int(min(chord_pitches)) % 12
         chord_roots.append(root)
+        if chord_entries and chord_entries[-1][1] == chord_name:
+            continue
+        bass_pc = int(min(chord_pitches)) % 12
         pitch_classes = sorted(set(p % 12 for p in chord_pitches))
-
-        chord_entries.append({
-            "start_q": start_q,
-            "chord_name": chord_name,
-            "root_pc": root,
-            "bass_pc": bass_pc,
-            "pitch_classes": pitch_classes,
-            "chord_pitches": chord_pitches,
-        })
+        chord_entries.append((start_q, chord_name, root, bass_pc, pitch_classes, chord_pitches))
 
     detected_key = detect_key_from_chords(chord_roots)
 
-    lines = ["```"]
-    lines.append("time_q | bar.beat | chord | roman | chord_tones (pitch classes)")
-
-    last_chord_name: Optional[str] = None
-    for entry in chord_entries:
-        chord_name = entry["chord_name"]
-        if chord_name == last_chord_name:
-            continue
-        last_chord_name = chord_name
-
-        start_q = entry["start_q"]
-        root_pc = entry["root_pc"]
-        bass_pc = entry["bass_pc"]
-        pitch_classes = entry["pitch_classes"]
-        chord_pitches = entry["chord_pitches"]
-
+    lines = [SKETCH_CHORD_MAP_TABLE_HEADER]
+    for start_q, chord_name, root_pc, bass_pc, pitch_classes, chord_pitches in chord_entries:
         degree = (
             ""
             if detected_key == "unknown"
@@ -371,8 +359,7 @@ def build_chord_map_from_sketch(
                 beat_in_bar = max(1.0, min(float(num), beat_in_bar))
         beat_str = f"{beat_in_bar:.1f}".rstrip("0").rstrip(".")
 
-        pc_str = str(pitch_classes)
-        lines.append(f"{start_q:6.1f} | {bar_num}.{beat_str:<4} | {chord_name:<6} | {degree:<5} | {pc_str}")
+        lines.append(f"{start_q:6.1f} | {bar_num}.{beat_str:<4} | {chord_name:<6} | {degree:<5} | {pitch_classes}")
 
     lines.append("```")
 
@@ -448,7 +435,7 @@ def build_horizontal_context_summary(
         last_notes = sorted(horizontal.before, key=lambda n: n.get("start_q", 0))[-4:]
         if last_notes:
             last_pitches = [n.get("pitch", 60) for n in last_notes]
-            parts.append(f"Last notes before target: {', '.join(pitch_to_note(p) for p in last_pitches)}")
+            parts.append(f"Last notes before target: {', '.join(map(pitch_to_note, last_pitches))}")
 
         continuity_analysis = analyze_horizontal_continuity(
             horizontal.before,
@@ -468,7 +455,7 @@ def build_horizontal_context_summary(
         first_notes = sorted(horizontal.after, key=lambda n: n.get("start_q", 0))[:4]
         if first_notes:
             first_pitches = [n.get("pitch", 60) for n in first_notes]
-            parts.append(f"First notes after target: {', '.join(pitch_to_note(p) for p in first_pitches)}")
+            parts.append(f"First notes after target: {', '.join(map(pitch_to_note, first_pitches))}")
 
     return "\n".join(parts), position
 
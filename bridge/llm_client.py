@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import hashlib
 import http.client
 import json
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import OrderedDict
+from threading import Lock
 from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException
@@ -20,9 +23,12 @@ try:
         DEFAULT_PROVIDER,
         DEFAULT_TEMPERATURE,
         HTTP_TIMEOUT_SEC,
+        LLM_RESPONSE_CACHE_LIMIT,
+        LLM_RESPONSE_CACHE_TTL_SEC,
         LLM_RETRY_ATTEMPTS,
         LLM_RETRY_BACKOFF_SEC,
         LOCAL_HOSTS,
+        OPENROUTER_PROMPT_CACHE,
     )
     from logger_config import logger
     from models import GenerateRequest, ModelInfo
@@ -36,9 +42,12 @@ except ImportError:
         DEFAULT_PROVIDER,
         DEFAULT_TEMPERATURE,
         HTTP_TIMEOUT_SEC,
+        LLM_RESPONSE_CACHE_LIMIT,
+        LLM_RESPONSE_CACHE_TTL_SEC,
         LLM_RETRY_ATTEMPTS,
         LLM_RETRY_BACKOFF_SEC,
         LOCAL_HOSTS,
+        OPENROUTER_PROMPT_CACHE,
     )
     from .logger_config import logger
     from .models import GenerateRequest, ModelInfo
@@ -94,13 +103,18 @@ def post_json(url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, An
 
 
 DEFAULT_MAX_TOKENS = 16384
+SYSTEM_MESSAGE_ROLE = "system"
+CACHE_CONTROL_EPHEMERAL = "ephemeral"
 
+_response_cache: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+_response_cache_lock = Lock()
 
-def call_lmstudio(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+
+def call_lmstudio(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, Any]]) -> str:
     url = build_url(base_url, "/chat/completions")
     payload = {
         "model": model_name,
-        "messages": messages,
+        "messages": flatten_messages(messages),
         "temperature": temperature,
         "max_tokens": DEFAULT_MAX_TOKENS,
         "stream": False,
@@ -112,11 +126,11 @@ def call_lmstudio(model_name: str, base_url: str, temperature: float, messages:
         raise HTTPException(status_code=502, detail="LM Studio response missing content") from exc
 
 
-def call_ollama(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+def call_ollama(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, Any]]) -> str:
     url = build_url(base_url, "/api/chat")
     payload = {
         "model": model_name,
-        "messages": messages,
+        "messages": flatten_messages(messages),
         "options": {"temperature": temperature, "num_predict": DEFAULT_MAX_TOKENS},
         "stream": False,
     }
@@ -127,12 +141,60 @@ def call_ollama(model_name: str, base_url: str, temperature: float, messages: Li
         raise HTTPException(status_code=502, detail="Ollama response missing content") from exc
 
 
-def call_openrouter(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, str]], api_key: str) -> str:
+def flatten_message_content(message: Dict[str, Any]) -> Dict[str, Any]:
+    content = message.get("content")
+    if not isinstance(content, list):
+        return message
+    return {**message, "content": "".join(block.get("text", "") for block in content if isinstance(block, dict))}
+
+
+def flatten_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [flatten_message_content(message) for message in messages]
+
+
+def mark_cache_breakpoint(message: Dict[str, Any]) -> Dict[str, Any]:
+    content = message.get("content")
+    if not isinstance(content, str) or not content:
+        return message
+    return {
+        **message,
+        "content": [{"type": "text", "text": content, "cache_control": {"type": CACHE_CONTROL_EPHEMERAL}}],
+    }
+
+
+def build_cached_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cached_messages: List[Dict[str, Any]] = list(messages)
+    system_index = next(
+        (i for i, message in enumerate(messages) if message.get("role") == SYSTEM_MESSAGE_ROLE),
+        None,
+    )
+    if system_index is not None:
+        cached_messages[system_index] = mark_cache_breakpoint(messages[system_index])
+    return cached_messages
+
+
+def log_openrouter_usage(response: Dict[str, Any]) -> None:
+    usage = response.get("usage")
+    if not isinstance(usage, dict):
+        return
+    details = usage.get("prompt_tokens_details")
+    if not isinstance(details, dict):
+        details = {}
+    logger.info(
+        "OpenRouter usage: prompt=%s cached=%s cache_write=%s completion=%s",
+        usage.get("prompt_tokens"),
+        details.get("cached_tokens", 0),
+        details.get("cache_write_tokens", 0),
+        usage.get("completion_tokens"),
+    )
+
+
+def call_openrouter(model_name: str, base_url: str, temperature: float, messages: List[Dict[str, Any]], api_key: str) -> str:
     url = build_url(base_url, "/chat/completions")
     logger.info("OpenRouter request: url=%s model=%s", url, model_name)
     payload = {
         "model": model_name,
-        "messages": messages,
+        "messages": build_cached_messages(messages) if OPENROUTER_PROMPT_CACHE else flatten_messages(messages),
         "temperature": temperature,
         "max_tokens": DEFAULT_MAX_TOKENS,
         "stream": False,
@@ -158,6 +220,7 @@ def call_openrouter(model_name: str, base_url: str, temperature: float, messages
     except json.JSONDecodeError as exc:
         logger.error("OpenRouter invalid JSON: %s", exc)
         raise HTTPException(status_code=502, detail=f"OpenRouter returned invalid JSON: {exc}") from exc
+    log_openrouter_usage(response)
     try:
         content = response["choices"][0]["message"]["content"]
         logger.info("OpenRouter response received: %d chars", len(content))
@@ -264,12 +327,70 @@ def resolve_model(request: GenerateRequest, profile: Dict[str, Any]) -> Tuple[st
     return provider, model_name, base_url, float(temperature), api_key
 
 
+def build_response_cache_key(
+    provider: str,
+    model_name: str,
+    base_url: str,
+    messages: List[Dict[str, Any]],
+) -> str:
+    raw = json.dumps([provider, model_name, base_url, messages], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(cache_key: str) -> Optional[str]:
+    with _response_cache_lock:
+        entry = _response_cache.get(cache_key)
+        if entry is None:
+            return None
+        stored_at, content = entry
+        if time.monotonic() - stored_at > LLM_RESPONSE_CACHE_TTL_SEC:
+            del _response_cache[cache_key]
+            return None
+        _response_cache.move_to_end(cache_key)
+        return content
+
+
+def store_cached_response(cache_key: str, content: str) -> None:
+    now = time.monotonic()
+    with _response_cache_lock:
+        expired = [key for key, (stored_at, _) in _response_cache.items() if now - stored_at > LLM_RESPONSE_CACHE_TTL_SEC]
+        for key in expired:
+            del _response_cache[key]
+        _response_cache[cache_key] = (now, content)
+        _response_cache.move_to_end(cache_key)
+        while len(_response_cache) > LLM_RESPONSE_CACHE_LIMIT:
+            _response_cache.popitem(last=False)
+
+
+def is_cacheable_response(content: str) -> bool:
+    try:
+        parse_llm_json(content)
+    except ValueError:
+        return False
+    return True
+
+
+def request_llm(
+    provider: str,
+    model_name: str,
+    base_url: str,
+    temperature: float,
+    messages: List[Dict[str, Any]],
+    api_key: Optional[str],
+) -> str:
+    if provider == "openrouter":
+        return call_openrouter(model_name, base_url, temperature, messages, api_key)
+    if provider == "ollama":
+        return call_ollama(model_name, base_url, temperature, messages)
+    return call_lmstudio(model_name, base_url, temperature, messages)
+
+
 def call_llm(
     provider: str,
     model_name: str,
     base_url: str,
     temperature: float,
-    messages: List[Dict[str, str]],
+    messages: List[Dict[str, Any]],
     api_key: Optional[str] = None,
 ) -> str:
     logger.info(
@@ -284,14 +405,22 @@ def call_llm(
         logger.error("OpenRouter requires an API key but none provided")
         raise HTTPException(status_code=400, detail="OpenRouter requires an API key")
 
+    cache_key = None
+    if temperature <= 0 and LLM_RESPONSE_CACHE_LIMIT > 0:
+        cache_key = build_response_cache_key(provider, model_name, base_url, messages)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            logger.info("LLM response cache hit: %s", cache_key[:12])
+            return cached
+        logger.info("LLM response cache miss: %s", cache_key[:12])
+
     max_attempts = max(1, int(LLM_RETRY_ATTEMPTS))
     for attempt in range(1, max_attempts + 1):
         try:
-            if provider == "openrouter":
-                return call_openrouter(model_name, base_url, temperature, messages, api_key)
-            if provider == "ollama":
-                return call_ollama(model_name, base_url, temperature, messages)
-            return call_lmstudio(model_name, base_url, temperature, messages)
+            content = request_llm(provider, model_name, base_url, temperature, messages, api_key)
+            if cache_key is not None and is_cacheable_response(content):
+                store_cached_response(cache_key, content)
+            return content
         except HTTPException as exc:
             if exc.status_code < 500 or attempt == max_attempts:
                 raise
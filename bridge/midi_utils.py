@@ -10,7 +10,6 @@ try:
         DEFAULT_VELOCITY,
         MIDI_CHAN_MAX,
         MIDI_CHAN_MIN,
-        MIDI_CHAN_ZERO_BASE_MAX,
         MIDI_MAX,
         MIDI_MIN,
         MIDI_VEL_MIN,
@@ -25,7 +24,6 @@ except ImportError:
         DEFAULT_VELOCITY,
         MIDI_CHAN_MAX,
         MIDI_CHAN_MIN,
-        MIDI_CHAN_ZERO_BASE_MAX,
         MIDI_MAX,
         MIDI_MIN,
         MIDI_VEL_MIN,
@@ -35,6 +33,7 @@ except ImportError:
     from .utils import clamp
 
 NOTE_RE = re.compile(r"^([A-Ga-g])([#b]?)(-?\d+)$")
+NOTE_LETTER_SEMITONES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
 
 DURATION_NAME_TO_Q = {
     "whole": 4.0, "w": 4.0,
@@ -188,8 +187,7 @@ def note_to_midi(note: Any) -> int:
             raise ValueError(f"Invalid note format: {note}")
         letter, accidental, octave_str = match.groups()
         octave = int(octave_str)
-        base_map = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
-        semitone = base_map[letter.upper()]
+        semitone = NOTE_LETTER_SEMITONES[letter.upper()]
         if accidental == "#":
             semitone += 1
         elif accidental == "b":
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from collections import Counter
-from typing import Any, Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
 
 try:
     from music_theory import analyze_chord, NOTE_NAMES, pitch_to_note
@@ -9,6 +10,18 @@ except ImportError:
     from .music_theory import analyze_chord, NOTE_NAMES, pitch_to_note
 
 
+DURATION_NAMES = MappingProxyType({
+    0.25: "16th",
+    0.5: "8th",
+    0.75: "dotted 8th",
+    1.0: "quarter",
+    1.5: "dotted quarter",
+    2.0: "half",
+    3.0: "dotted half",
+    4.0: "whole",
+})
+
+
 def analyze_melodic_context(notes: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not notes:
         return {}
@@ -176,18 +189,8 @@ def analyze_rhythmic_pattern(notes: List[Dict[str, Any]], time_sig: str = "4/4")
     common_durations = duration_counts.most_common(3)
 
     duration_names = []
-    dur_map = {
-        0.25: "16th",
-        0.5: "8th",
-        0.75: "dotted 8th",
-        1.0: "quarter",
-        1.5: "dotted quarter",
-        2.0: "half",
-        3.0: "dotted half",
-        4.0: "whole",
-    }
     for dur, count in common_durations:
-        name = dur_map.get(dur, f"{dur}q")
+        name = DURATION_NAMES.get(dur) or f"{dur}q"
         duration_names.append({"duration": name, "quarters": dur, "count": count})
 
     patterns = []
@@ -335,13 +338,13 @@ def build_rhythmic_context_prompt(analysis: Dict[str, Any]) -> str:
 
     anchor_beats = analysis.get("anchor_beats", [])
     if anchor_beats:
-        beats_str = ", ".join(str(b) for b in anchor_beats[:4])
+        beats_str = ", ".join(map(str, anchor_beats[:4]))
         lines.append(f"- Pulse grid (from time signature): {beats_str}")
         lines.append("  ALIGN your accents to these beats for cohesion")
 
     observed_beats = analysis.get("observed_anchor_beats", [])
     if observed_beats:
-        obs_str = ", ".join(str(b) for b in observed_beats[:4])
+        obs_str = ", ".join(map(str, observed_beats[:4]))
         lines.append(f"- Observed accents (from existing parts): {obs_str}")
 
     durations = analysis.get("common_durations", [])
@@ -4,6 +4,12 @@ from typing import Any, Dict, List, Optional, Tuple
 
 NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 NOTE_NAMES_FLAT = ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
+NOTE_NAME_TO_PC = {
+    "C": 0, "C#": 1, "Db": 1, "D": 2, "D#": 3, "Eb": 3,
+    "E": 4, "Fb": 4, "E#": 5, "F": 5, "F#": 6, "Gb": 6,
+    "G": 7, "G#": 8, "Ab": 8, "A": 9, "A#": 10, "Bb": 10,
+    "B": 11, "Cb": 11, "B#": 0,
+}
 
 DURATION_NAMES = {
     4.0: "whole",
@@ -95,14 +101,7 @@ def note_to_midi(note_str: str) -> int:
     
     note_upper = note_part[0].upper() + note_part[1:] if note_part else "C"
     
-    note_to_pc = {
-        "C": 0, "C#": 1, "Db": 1, "D": 2, "D#": 3, "Eb": 3,
-        "E": 4, "Fb": 4, "E#": 5, "F": 5, "F#": 6, "Gb": 6,
-        "G": 7, "G#": 8, "Ab": 8, "A": 9, "A#": 10, "Bb": 10,
-        "B": 11, "Cb": 11, "B#": 0,
-    }
-    
-    pc = note_to_pc.get(note_upper, 0)
+    pc = NOTE_NAME_TO_PC.get(note_upper, 0)
     
     try:
         octave = int(octave_part) if octave_part else 4
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Set, Tuple
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+SCALE_CACHE_SIZE = 128
 
 NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
@@ -779,6 +782,7 @@ def get_circle_of_fifths_distance(key1: str, key2: str) -> int:
     return min(fifths, 12 - fifths)
 
 
+@lru_cache(maxsize=SCALE_CACHE_SIZE)
 def parse_key(key_str: str) -> Tuple[int, str]:
     if not key_str or key_str.lower() == "unknown":
         return 0, "major"
@@ -816,25 +820,17 @@ def parse_key(key_str: str) -> Tuple[int, str]:
 
 
 def get_scale_notes(key_str: str, pitch_low: int, pitch_high: int) -> List[int]:
-    root_pc, scale_type = parse_key(key_str)
-    intervals = SCALE_INTERVALS.get(scale_type, SCALE_INTERVALS["major"])
+    return list(_get_scale_notes_cached(key_str, pitch_low, pitch_high))
 
-    scale_pcs = set((root_pc + i) % 12 for i in intervals)
 
-    if scale_type in ("minor", "natural minor", "aeolian"):
-        harmonic_intervals = SCALE_INTERVALS.get("harmonic minor", [])
-        for i in harmonic_intervals:
-            scale_pcs.add((root_pc + i) % 12)
-
-    valid_pitches = []
-    for pitch in range(pitch_low, pitch_high + 1):
-        if pitch % 12 in scale_pcs:
-            valid_pitches.append(pitch)
-
-    return valid_pitches
+@lru_cache(maxsize=SCALE_CACHE_SIZE)
+def _get_scale_notes_cached(key_str: str, pitch_low: int, pitch_high: int) -> Tuple[int, ...]:
+    scale_pcs = get_scale_pitch_classes(key_str)
+    return tuple(pitch for pitch in range(pitch_low, pitch_high + 1) if pitch % 12 in scale_pcs)
 
 
-def get_scale_pitch_classes(key_str: str) -> Set[int]:
+@lru_cache(maxsize=SCALE_CACHE_SIZE)
+def get_scale_pitch_classes(key_str: str) -> FrozenSet[int]:
     root_pc, scale_type = parse_key(key_str)
     intervals = SCALE_INTERVALS.get(scale_type, SCALE_INTERVALS["major"])
     scale_pcs = set((root_pc + i) % 12 for i in intervals)
@@ -844,9 +840,10 @@ def get_scale_pitch_classes(key_str: str) -> Set[int]:
         for i in harmonic_intervals:
             scale_pcs.add((root_pc + i) % 12)
 
-    return scale_pcs
+    return frozenset(scale_pcs)
 
 
+@lru_cache(maxsize=SCALE_CACHE_SIZE)
 def get_scale_note_names(key_str: str) -> str:
     root_pc, scale_type = parse_key(key_str)
     intervals = SCALE_INTERVALS.get(scale_type, SCALE_INTERVALS["major"])
@@ -7,6 +7,7 @@ try:
         build_prompt,
         build_selection_info,
         build_tempo_change_guidance,
+        join_prompt_segments,
     )
     from prompt_builder_plans import build_arrange_plan_prompt, build_plan_prompt
     from prompt_builder_sketch import (
@@ -45,6 +46,7 @@ except ImportError:
         build_prompt,
         build_selection_info,
         build_tempo_change_guidance,
+        join_prompt_segments,
     )
     from .prompt_builder_plans import build_arrange_plan_prompt, build_plan_prompt
     from .prompt_builder_sketch import (
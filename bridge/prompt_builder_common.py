@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional, Tuple
 
 
 UNKNOWN_VALUE = "unknown"
@@ -19,22 +21,22 @@ ZERO_TIME_Q = 0.0
 RANGE_BOUND_COUNT = 2
 SEMITONES_PER_OCTAVE = 12
 
-ROLE_KEYWORDS = {
+ROLE_KEYWORDS = MappingProxyType({
     "melody": ("melody", "lead", "theme", "motif", "solo"),
     "bass": ("bass", "low end", "root"),
     "harmony": ("harmony", "chord", "pad", "support", "accompaniment"),
     "rhythm": ("rhythm", "groove", "percussion", "drum", "pulse", "ostinato"),
     "countermelody": ("countermelody", "counter-melody", "counter line"),
-}
+})
 
-FAMILY_ROLE_DEFAULTS = {
+FAMILY_ROLE_DEFAULTS = MappingProxyType({
     "bass": "bass",
     "drums": "rhythm",
     "percussion": "rhythm",
     "strings": "harmony",
     "woodwinds": "melody",
     "brass": "melody",
-}
+})
 
 
 def normalize_text(value: Any) -> str:
@@ -49,7 +51,8 @@ def is_non_empty_list(value: Any) -> bool:
     return isinstance(value, list) and bool(value)
 
 
-def import_music_notation():
+@lru_cache(maxsize=1)
+def import_music_notation() -> Tuple[Callable[..., str], Callable[..., str], Callable[..., str]]:
     try:
         from music_notation import midi_to_note, dur_q_to_name, velocity_to_dynamic
     except ImportError:
@@ -57,7 +60,8 @@ def import_music_notation():
     return midi_to_note, dur_q_to_name, velocity_to_dynamic
 
 
-def import_note_to_midi():
+@lru_cache(maxsize=1)
+def import_note_to_midi() -> Callable[[Any], int]:
     try:
         from midi_utils import note_to_midi
     except ImportError:
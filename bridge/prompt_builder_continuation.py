@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     from constants import (
@@ -59,7 +59,7 @@ def resolve_section_position(value: Any) -> str:
     return DEFAULT_SECTION_POSITION
 
 
-def format_motif_notes(notes: List[Dict[str, Any]], midi_to_note) -> str:
+def format_motif_notes(notes: List[Dict[str, Any]], midi_to_note: Callable[[int], str]) -> str:
     entries: List[str] = []
     for note in notes:
         start_q = float(note.get("start_q", DEFAULT_START_Q))
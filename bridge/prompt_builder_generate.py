@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 try:
     from constants import (
@@ -15,28 +17,28 @@ try:
         build_chord_map_from_sketch,
         build_context_summary,
         build_ensemble_context,
-        get_quarters_per_bar,
     )
     from models import GenerateRequest
+    from music_notation import midi_to_note
     from music_theory import get_scale_note_names
     from promts import BASE_SYSTEM_PROMPT, CONTINUATION_SYSTEM_PROMPT_TEMPLATE, FREE_MODE_SYSTEM_PROMPT
     from prompt_builder_continuation import build_continuation_prompt, build_full_selection_context
     from prompt_builder_plan_sections import append_generated_motif_section, append_plan_sections
     from prompt_builder_sketch import build_arrangement_context
     from prompt_builder_utils import (
-        MIN_BARS_COUNT,
         UNKNOWN_VALUE,
         build_generation_progress,
         build_orchestration_hints_prompt,
-        estimate_note_count,
+        estimate_selection_note_count,
         extract_key_from_chord_map,
         extract_role_from_plan,
         format_profile_for_prompt,
         format_profile_user_template,
         get_custom_curves_info,
-        import_music_notation,
+        get_selection_bars,
         infer_key_from_plan_chord_map,
         is_non_empty_list,
+        is_short_articulation,
         normalize_lower,
         normalize_text,
         resolve_prompt_articulation,
@@ -45,7 +47,7 @@ try:
     from style import DYNAMICS_HINTS, MOOD_HINTS
     from type import TYPE_HINTS
     from text_utils import fix_mojibake
-    from utils import safe_format
+    from utils import get_template_fields, safe_format
 except ImportError:
     from .constants import (
         DEFAULT_GENERATION_STYLE,
@@ -58,28 +60,28 @@ except ImportError:
         build_chord_map_from_sketch,
         build_context_summary,
         build_ensemble_context,
-        get_quarters_per_bar,
     )
     from .models import GenerateRequest
+    from .music_notation import midi_to_note
     from .music_theory import get_scale_note_names
     from .promts import BASE_SYSTEM_PROMPT, CONTINUATION_SYSTEM_PROMPT_TEMPLATE, FREE_MODE_SYSTEM_PROMPT
     from .prompt_builder_continuation import build_continuation_prompt, build_full_selection_context
     from .prompt_builder_plan_sections import append_generated_motif_section, append_plan_sections
     from .prompt_builder_sketch import build_arrangement_context
     from .prompt_builder_utils import (
-        MIN_BARS_COUNT,
         UNKNOWN_VALUE,
         build_generation_progress,
         build_orchestration_hints_prompt,
-        estimate_note_count,
+        estimate_selection_note_count,
         extract_key_from_chord_map,
         extract_role_from_plan,
         format_profile_for_prompt,
         format_profile_user_template,
         get_custom_curves_info,
-        import_music_notation,
+        get_selection_bars,
         infer_key_from_plan_chord_map,
         is_non_empty_list,
+        is_short_articulation,
         normalize_lower,
         normalize_text,
         resolve_prompt_articulation,
@@ -88,7 +90,7 @@ except ImportError:
     from .style import DYNAMICS_HINTS, MOOD_HINTS
     from .type import TYPE_HINTS
     from .text_utils import fix_mojibake
-    from .utils import safe_format
+    from .utils import get_template_fields, safe_format
 
 
 FREE_MODE_MIN_NOTES = 1
@@ -107,7 +109,181 @@ REPETITIVE_TYPES = ("ostinato", "rhythm", "accomp", "arpeggio", "bass")
 PERCUSSION_FAMILIES = ("drums", "percussion", "perc")
 DEFAULT_MOOD_HINT_TEMPLATE = "STYLE: {style}. CHARACTER: Create a part in this style."
 DEFAULT_DYNAMICS_HINT = "EXPRESSION: Follow phrase shape. DYNAMICS: Natural breathing."
+STYLE_DEFAULT_DYNAMICS_HINT = DYNAMICS_HINTS.get("default", DEFAULT_DYNAMICS_HINT)
 DEFAULT_TYPE_HINT_TEMPLATE = "ROLE: Generate a {generation_type} part. OBJECTIVE: Musical, memorable, fitting."
+GENERATION_HINTS_CACHE_SIZE = 512
+KEY_CONTEXT_CACHE_SIZE = 64
+PITCH_RANGE_CACHE_SIZE = 64
+EMPTY_PRESET_SETTINGS_JSON = "{}"
+PRESET_SETTINGS_ENCODER = json.JSONEncoder(ensure_ascii=False)
+EMPTY_PROFILE_SECTION = MappingProxyType({})
+PRESET_SETTINGS_FIELD = "preset_settings"
+REQUEST_TEMPLATE_FIELDS = frozenset({
+    "bpm",
+    "time_sig",
+    "key",
+    "selection_quarters",
+    "min_notes",
+    "max_notes",
+    "preset_name",
+    PRESET_SETTINGS_FIELD,
+})
+SYSTEM_MESSAGE_ROLE = "system"
+USER_MESSAGE_ROLE = "user"
+CACHE_CONTROL_EPHEMERAL = "ephemeral"
+PROMPT_SEGMENT_SEPARATOR = "\n\n"
+PromptSegment = Tuple[str, bool]
+SELECTION_GUIDANCE_LINES = (
+    "- Time axis: notes use start_q, curves use time_q (quarter notes from selection start)",
+    "- How much of this range to fill is YOUR creative decision based on user request and context",
+    "- RECOMMENDATION: Plan the musical development (intro, theme, resolution) to fit within the available range",
+    "- Consider using the full selection for complete compositions; shorter portions for fragments or phrases",
+    "- Patterns/repeats can help keep JSON concise for repeating figures",
+)
+PATTERN_CLONING_HEADER = "\n### PATTERN CLONING (use for repetitive content)"
+DRUM_PATTERN_GUIDANCE = (
+    "⚠️ DRUMS/PERCUSSION: You MUST use patterns/repeats for grooves!",
+    "DO NOT duplicate the same notes bar after bar manually.",
+    "",
+    "EXAMPLE for drum groove:",
+    '  "patterns": [{"id": "groove", "length_q": 4, "notes": [...one bar of notes...]}],',
+    '  "repeats": [{"pattern": "groove", "start_q": 0, "times": N, "step_q": 4}],',
+    '  "notes": []  // empty - all notes come from patterns',
+)
+REPETITIVE_PATTERN_GUIDANCE = (
+    "For repetitive figures (ostinatos, arpeggios, bass lines) - USE patterns/repeats!",
+    "Define the pattern once, then repeat it. Much more efficient than duplicating notes.",
+    "",
+    'EXAMPLE: "patterns": [{"id": "ost", "length_q": 2, "notes": [...]}],',
+    '         "repeats": [{"pattern": "ost", "start_q": 0, "times": 16, "step_q": 2}]',
+)
+DEFERRED_TEMPO_GUIDANCE = (
+    "\n### TEMPO/TIME SIGNATURE CHANGES",
+    "Tempo/time signature will be applied AFTER all parts are generated.",
+    "Output tempo_markers ONLY in the FINAL part or a dedicated tempo request.",
+    "DO NOT output tempo_markers for this response.",
+)
+TEMPO_CONTROL_HEADER = "\n### TEMPO & TIME SIGNATURE CONTROL (YOUR CREATIVE CHOICE)"
+TEMPO_CONTROL_OPTIONS = (
+    "",
+    "YOU MAY CHANGE the initial tempo if it doesn't fit the style/mood you're creating.",
+    "The project tempo is just a starting point - override it if musically appropriate.",
+    "Tempo/time signature changes will be applied AFTER all parts are generated.",
+    "",
+    "YOUR OPTIONS:",
+    "- OVERRIDE initial tempo (time_q: 0) - set what fits the mood/genre",
+    "- ADD tempo changes for dramatic effect (accelerando, ritardando)",
+    "- CHANGE time signature when needed (3/4 waltz, 6/8 compound, mixed meter)",
+    "",
+    'FORMAT: tempo_markers: [{"time_q": 0, "bpm": 85, "num": 3, "denom": 4}, ...]',
+    "",
+    "FIELDS:",
+)
+TEMPO_CONTROL_EXAMPLES = (
+    "- bpm: tempo in beats per minute (REQUIRED at time_q=0 to set initial tempo)",
+    "- num/denom: time signature (e.g. num:6, denom:8 for 6/8)",
+    "- linear: true for gradual tempo ramp, false for instant change",
+    "",
+    "EXAMPLES:",
+    '- Set tempo: [{"time_q": 0, "bpm": 72}]',
+    '- Set tempo + time sig: [{"time_q": 0, "bpm": 90, "num": 6, "denom": 8}]',
+    '- Accelerando: [{"time_q": 0, "bpm": 60}, {"time_q": 24, "bpm": 100, "linear": true}]',
+    '- Ritardando at end: [{"time_q": 0, "bpm": 120}, {"time_q": 48, "bpm": 80, "linear": true}]',
+    "",
+    "COMMON TIME SIGNATURES: 4/4, 3/4, 2/4, 6/8, 12/8, 5/4, 7/8",
+    "Keep markers in ascending order. Max 4-6 markers.",
+)
+SEQUENTIAL_TEMPO_NOTE = (
+    "",
+    "IMPORTANT: Only output tempo_markers for the FINAL instrument in sequential generation.",
+)
+FREE_MODE_DECISION_LINES = (
+    "",
+    "YOU DECIDE: Choose the best generation type, style, and articulations for this context.",
+    "IMPORTANT: Match your output complexity to what the user requests. Simple request = simple output.",
+    "",
+)
+FREE_MODE_CURVES_NOTE = (
+    "",
+    "Note: Use Expression curve (CC11) for overall dynamics, Dynamics curve (CC1) for per-note shaping. For SHORT articulations, velocity is primary.",
+)
+COMPOSITION_RULES_HEADER = "\n### COMPOSITION RULES"
+FREE_MODE_RULES_TEMPLATE = "\n".join([
+    COMPOSITION_RULES_HEADER,
+    "{allowed_range_line}",
+    "- Channel: {midi_channel}",
+    "- Generate appropriate number of notes for the part type",
+])
+COMPOSITION_RULES_TEMPLATE = "\n".join([
+    COMPOSITION_RULES_HEADER,
+    "{allowed_range_line}",
+    "- Suggested note count: {min_notes}-{max_notes} (adapt based on musical needs)",
+    "- Channel: {midi_channel}",
+])
+WIND_BRASS_MAX_DUR_HINT = (
+    f"- MAX NOTE DURATION: {int(WIND_BRASS_MAX_NOTE_DUR_Q)} beats (~2 bars) for wind/brass"
+    " - split longer notes with breath rests"
+)
+INSTRUMENT_RULES_HEADER = "\n### INSTRUMENT-SPECIFIC RULES:"
+INSTRUMENT_CURVES_HEADER = "\n### INSTRUMENT CURVES (use these curve names):"
+
+FREE_MODE_CHOICES_AND_DYNAMICS_BLOCK = "\n".join([
+    "",
+    "### YOUR CREATIVE CHOICES",
+    "- Choose generation TYPE based on user request or context (Melody, Arpeggio, Chords, Pad, Bass, etc.)",
+    "- Choose STYLE that fits (Heroic, Romantic, Dark, Cinematic, etc.)",
+    "- Articulations: use ONE for simple parts (pads, chords), MULTIPLE only for expressive melodic parts",
+    "",
+    "### THREE-LAYER DYNAMICS",
+    "1. DYNAMICS (dyn): Note attack intensity - p, mp, mf, f, ff",
+    "2. EXPRESSION CURVE (CC11): GLOBAL phrase arc across the part",
+    "3. DYNAMICS CURVE (CC1): PER-NOTE swells for sustained notes",
+    "",
+    "DYNAMICS CURVE (CC1) - CRITICAL:",
+    "- Values: 40-127 (40=pp, 64=mp, 80=mf, 100=f, 120=ff)",
+    "- Use 2-3 points per sustained note (start/peak/release)",
+    "- Smooth motion within each note (avoid jumps >20 within a note)",
+    "- Short notes can omit CC1; use velocity/dyn instead",
+    "- Follow DYNAMIC ARC with CC11 (global), not CC1",
+])
+THREE_LAYER_DYNAMICS_TEMPLATE = "\n".join([
+    "",
+    "### THREE-LAYER DYNAMICS",
+    "1. DYNAMICS: {velocity_hint}",
+    "2. EXPRESSION CURVE (CC11): GLOBAL phrase arc across the part",
+    "3. DYNAMICS CURVE (CC1): PER-NOTE swells for sustained notes",
+    "",
+    "DYNAMICS CURVE (CC1): Use 2-3 points per sustained note, smooth within each note",
+])
+SHORT_ARTICULATION_DYNAMICS_BLOCK = THREE_LAYER_DYNAMICS_TEMPLATE.format(
+    velocity_hint="Use dyn for note-to-note dynamics (accents: f-fff, normal: mf-f, soft: p-mp)"
+)
+LONG_ARTICULATION_DYNAMICS_BLOCK = THREE_LAYER_DYNAMICS_TEMPLATE.format(
+    velocity_hint="Vary dynamics for phrase shaping (peaks: f-ff, between: mf)"
+)
+USER_REQUEST_HEADER = "\n### USER REQUEST (PRIORITY - follow these instructions, they override defaults):"
+FREE_MODE_INSTRUMENT_RULES_HEADER = "\n### !!! CRITICAL INSTRUMENT RULES - READ FIRST !!!"
+FREE_MODE_INSTRUMENT_CURVES_HEADER = "\n### INSTRUMENT CURVES"
+USER_REQUEST_INTERPRETATION_BLOCK = "\n".join([
+    "",
+    "INTERPRET USER REQUEST:",
+    "- If user asks for 'simple', 'basic', 'straightforward' → create simple, clean output",
+    "- If user mentions dynamics (crescendo, forte, soft, etc.) → apply to Expression curve (CC11) for overall, Dynamics curve (CC1) for per-note detail",
+    "- If user forbids spikes or caps max dynamics (e.g. 'cap at f, no ff') → enforce strictly in velocity/CC (no sfz, no sudden accents, no abrupt jumps)",
+    "- If user mentions a composer style (Zimmer, Williams, etc.) → match their typical approach",
+    "- If user asks for chords/pads → use sustained notes, minimal articulation changes",
+])
+HANDOFF_REQUIREMENT_BLOCK = "\n".join([
+    "",
+    "### HANDOFF REQUIREMENT (MANDATORY for ensemble)",
+    "You MUST include a 'handoff' object in your JSON response.",
+    "This helps the next musician understand your contribution and find their place.",
+    "Focus on: what space you occupied, what you left open, and advice for the next instrument.",
+])
+OUTPUT_TRAILER = "\n".join([
+    "",
+    "### OUTPUT (valid JSON only):",
+])
 
 
 def build_selection_info(length_q: float, quarters_per_bar: float, bars: int) -> List[str]:
@@ -117,18 +293,14 @@ def build_selection_info(length_q: float, quarters_per_bar: float, bars: int) ->
     return [
         "### SELECTION (working area)",
         f"- Available range: {bars} bars (start_q 0 to {length_hint} quarter notes)",
-        "- Time axis: notes use start_q, curves use time_q (quarter notes from selection start)",
-        "- How much of this range to fill is YOUR creative decision based on user request and context",
-        "- RECOMMENDATION: Plan the musical development (intro, theme, resolution) to fit within the available range",
-        "- Consider using the full selection for complete compositions; shorter portions for fragments or phrases",
-        "- Patterns/repeats can help keep JSON concise for repeating figures",
+        *SELECTION_GUIDANCE_LINES,
     ]
 
 
 def build_pattern_guidance(profile: Dict[str, Any], generation_type: str, bars: int) -> List[str]:
-    is_drum = bool(profile.get("midi", {}).get("is_drum", False))
-    family = normalize_lower(profile.get("family", ""))
-    gen_lower = normalize_lower(generation_type or "")
+    is_drum = bool((profile.get("midi") or EMPTY_PROFILE_SECTION).get("is_drum", False))
+    family = normalize_lower(profile.get("family"))
+    gen_lower = normalize_lower(generation_type)
 
     is_percussion_family = family in PERCUSSION_FAMILIES
     is_repetitive_type = any(t in gen_lower for t in REPETITIVE_TYPES)
@@ -141,89 +313,78 @@ def build_pattern_guidance(profile: Dict[str, Any], generation_type: str, bars:
     if not (is_drum or is_percussion_family or is_repetitive_type or bars_int >= PATTERN_BARS_THRESHOLD):
         return []
 
-    lines = ["### PATTERN CLONING (use for repetitive content)"]
-
     if is_drum or is_percussion_family:
-        lines.extend([
-            "⚠️ DRUMS/PERCUSSION: You MUST use patterns/repeats for grooves!",
-            "DO NOT duplicate the same notes bar after bar manually.",
-            "",
-            "EXAMPLE for drum groove:",
-            '  "patterns": [{"id": "groove", "length_q": 4, "notes": [...one bar of notes...]}],',
-            '  "repeats": [{"pattern": "groove", "start_q": 0, "times": N, "step_q": 4}],',
-            '  "notes": []  // empty - all notes come from patterns',
-        ])
-    elif is_repetitive_type:
-        lines.extend([
-            "For repetitive figures (ostinatos, arpeggios, bass lines) - USE patterns/repeats!",
-            "Define the pattern once, then repeat it. Much more efficient than duplicating notes.",
-            "",
-            'EXAMPLE: "patterns": [{"id": "ost", "length_q": 2, "notes": [...]}],',
-            '         "repeats": [{"pattern": "ost", "start_q": 0, "times": 16, "step_q": 2}]',
-        ])
-    else:
-        lines.extend([
-            f"For {bars_int} bars - consider using patterns/repeats if your figure repeats.",
-            "This keeps JSON compact and ensures consistent timing.",
-        ])
-
-    return lines
+        return [PATTERN_CLONING_HEADER, *DRUM_PATTERN_GUIDANCE]
+    if is_repetitive_type:
+        return [PATTERN_CLONING_HEADER, *REPETITIVE_PATTERN_GUIDANCE]
+    return [
+        PATTERN_CLONING_HEADER,
+        f"For {bars_int} bars - consider using patterns/repeats if your figure repeats.",
+        "This keeps JSON compact and ensures consistent timing.",
+    ]
 
 
 def build_tempo_change_guidance(request: GenerateRequest, length_q: float) -> List[str]:
     if not request.allow_tempo_changes:
         return []
 
-    if request.ensemble and request.ensemble.is_sequential:
-        total_instruments = int(request.ensemble.total_instruments or 0)
-        generation_order = int(request.ensemble.generation_order or GENERATION_ORDER_DEFAULT)
+    ensemble = request.ensemble
+    is_sequential = bool(ensemble and ensemble.is_sequential)
+    if is_sequential:
+        total_instruments = int(ensemble.total_instruments or 0)
+        generation_order = int(ensemble.generation_order or GENERATION_ORDER_DEFAULT)
         if total_instruments > 0 and generation_order < total_instruments:
-            return [
-                "### TEMPO/TIME SIGNATURE CHANGES",
-                "Tempo/time signature will be applied AFTER all parts are generated.",
-                "Output tempo_markers ONLY in the FINAL part or a dedicated tempo request.",
-                "DO NOT output tempo_markers for this response.",
-            ]
+            return list(DEFERRED_TEMPO_GUIDANCE)
 
     length_hint = round(float(length_q or ZERO_FLOAT), TEMPO_LENGTH_PRECISION)
     current_bpm = request.music.bpm
     current_time_sig = request.music.time_sig
     lines = [
-        "### TEMPO & TIME SIGNATURE CONTROL (YOUR CREATIVE CHOICE)",
+        TEMPO_CONTROL_HEADER,
         f"Project default: {current_bpm} BPM, {current_time_sig}",
-        "",
-        "YOU MAY CHANGE the initial tempo if it doesn't fit the style/mood you're creating.",
-        "The project tempo is just a starting point - override it if musically appropriate.",
-        "Tempo/time signature changes will be applied AFTER all parts are generated.",
-        "",
-        "YOUR OPTIONS:",
-        "- OVERRIDE initial tempo (time_q: 0) - set what fits the mood/genre",
-        "- ADD tempo changes for dramatic effect (accelerando, ritardando)",
-        "- CHANGE time signature when needed (3/4 waltz, 6/8 compound, mixed meter)",
-        "",
-        'FORMAT: tempo_markers: [{"time_q": 0, "bpm": 85, "num": 3, "denom": 4}, ...]',
-        "",
-        "FIELDS:",
+        *TEMPO_CONTROL_OPTIONS,
         f"- time_q: position in quarter notes (0..{length_hint})",
-        "- bpm: tempo in beats per minute (REQUIRED at time_q=0 to set initial tempo)",
-        "- num/denom: time signature (e.g. num:6, denom:8 for 6/8)",
-        "- linear: true for gradual tempo ramp, false for instant change",
-        "",
-        "EXAMPLES:",
-        '- Set tempo: [{"time_q": 0, "bpm": 72}]',
-        '- Set tempo + time sig: [{"time_q": 0, "bpm": 90, "num": 6, "denom": 8}]',
-        '- Accelerando: [{"time_q": 0, "bpm": 60}, {"time_q": 24, "bpm": 100, "linear": true}]',
-        '- Ritardando at end: [{"time_q": 0, "bpm": 120}, {"time_q": 48, "bpm": 80, "linear": true}]',
-        "",
-        "COMMON TIME SIGNATURES: 4/4, 3/4, 2/4, 6/8, 12/8, 5/4, 7/8",
-        "Keep markers in ascending order. Max 4-6 markers.",
+        *TEMPO_CONTROL_EXAMPLES,
     ]
-    if request.ensemble and request.ensemble.is_sequential:
-        lines.append("")
-        lines.append("IMPORTANT: Only output tempo_markers for the FINAL instrument in sequential generation.")
+    if is_sequential:
+        lines.extend(SEQUENTIAL_TEMPO_NOTE)
     return lines
 
 
+def serialize_preset_settings(preset_settings: Dict[str, Any]) -> str:
+    if isinstance(preset_settings, dict) and not preset_settings:
+        return EMPTY_PRESET_SETTINGS_JSON
+    return PRESET_SETTINGS_ENCODER.encode(preset_settings)
+
+
+def resolve_generation_hints(generation_type: str, generation_style: str) -> Tuple[str, str, str]:
+    style_lower = generation_style.lower()
+    mood_hint = MOOD_HINTS.get(style_lower)
+    if mood_hint is None:
+        mood_hint = DEFAULT_MOOD_HINT_TEMPLATE.format(style=generation_style)
+    dynamics_hint = DYNAMICS_HINTS.get(style_lower, STYLE_DEFAULT_DYNAMICS_HINT)
+    type_hint = TYPE_HINTS.get(generation_type.lower())
+    if type_hint is None:
+        type_hint = DEFAULT_TYPE_HINT_TEMPLATE.format(generation_type=generation_type)
+    return type_hint, mood_hint, dynamics_hint
+
+
+@lru_cache(maxsize=GENERATION_HINTS_CACHE_SIZE)
+def build_generation_target_block(generation_type: str, generation_style: str) -> str:
+    type_hint, mood_hint, dynamics_hint = resolve_generation_hints(generation_type, generation_style)
+    return "\n".join([
+        "### GENERATION TARGET (WHAT TO BUILD)",
+        f"1. PART TYPE ({generation_type}):",
+        type_hint,
+        "",
+        f"2. STYLE ({generation_style}):",
+        mood_hint,
+        "",
+        "3. DYNAMICS GOAL:",
+        dynamics_hint,
+    ])
+
+
 def build_musical_context_lines(
     final_key: str,
     scale_notes: str,
@@ -234,19 +395,23 @@ def build_musical_context_lines(
     selection_info: List[str],
     include_scale_notes: bool,
 ) -> List[str]:
-    lines = ["### MUSICAL CONTEXT"]
-    key_is_known = final_key and final_key.lower() not in (UNKNOWN_VALUE, "")
-    if key_is_known:
-        lines.append(f"- Key: {final_key}")
-        if include_scale_notes and scale_notes:
-            lines.append(f"- Scale notes: {scale_notes}")
-    lines.extend([
+    return [
+        "### MUSICAL CONTEXT",
+        *build_key_context_lines(final_key, scale_notes if include_scale_notes else ""),
         f"- Tempo: {bpm} BPM, Time: {time_sig}",
         f"- Length: {bars} bars ({round(length_q, MUSICAL_LENGTH_PRECISION)} quarter notes)",
         "",
         *selection_info,
-    ])
-    return lines
+    ]
+
+
+@lru_cache(maxsize=KEY_CONTEXT_CACHE_SIZE)
+def build_key_context_lines(final_key: str, scale_notes: str) -> Tuple[str, ...]:
+    if not final_key or final_key.lower() == UNKNOWN_VALUE:
+        return ()
+    if scale_notes:
+        return f"- Key: {final_key}", f"- Scale notes: {scale_notes}"
+    return (f"- Key: {final_key}",)
 
 
 def build_instrument_profile_lines(profile_info: str) -> List[str]:
@@ -261,65 +426,33 @@ def build_free_mode_prompt_parts(
     profile_user_formatted: str,
     custom_curves_info: str,
     profile_info: str,
-    final_key: str,
-    scale_notes: str,
-    bpm: float,
-    time_sig: str,
-    bars: int,
-    length_q: float,
-    selection_info: List[str],
-    is_ensemble: bool,
 ) -> List[str]:
     user_prompt_parts = [
         f"## FREE MODE COMPOSITION for {profile.get('name', 'instrument')}",
     ]
 
     if profile_user_formatted:
-        user_prompt_parts.extend([
-            "",
-            "### !!! CRITICAL INSTRUMENT RULES - READ FIRST !!!",
-            profile_user_formatted,
-        ])
+        user_prompt_parts.extend([FREE_MODE_INSTRUMENT_RULES_HEADER, profile_user_formatted])
     if custom_curves_info:
         if not profile_user_formatted:
-            user_prompt_parts.extend([
-                "",
-                "### INSTRUMENT CURVES",
-            ])
+            user_prompt_parts.append(FREE_MODE_INSTRUMENT_CURVES_HEADER)
         user_prompt_parts.append(
             f"Additional curves (optional unless instrument rules say otherwise): {custom_curves_info}"
         )
 
     user_prompt_parts.extend([
-        "",
-        "YOU DECIDE: Choose the best generation type, style, and articulations for this context.",
-        "IMPORTANT: Match your output complexity to what the user requests. Simple request = simple output.",
-        "",
+        *FREE_MODE_DECISION_LINES,
         *build_instrument_profile_lines(profile_info),
-        "",
-        *build_musical_context_lines(
-            final_key,
-            scale_notes,
-            bpm,
-            time_sig,
-            bars,
-            length_q,
-            selection_info,
-            include_scale_notes=True,
-        ),
     ])
+    return user_prompt_parts
 
-    user_prompt_parts.extend([
-        "",
-        "Note: Use Expression curve (CC11) for overall dynamics, Dynamics curve (CC1) for per-note shaping. For SHORT articulations, velocity is primary.",
-    ])
 
+def build_free_mode_context_notes(profile: Dict[str, Any], is_ensemble: bool) -> List[str]:
+    notes = list(FREE_MODE_CURVES_NOTE)
     orchestration_hints_prompt = build_orchestration_hints_prompt(profile, is_ensemble)
     if orchestration_hints_prompt:
-        user_prompt_parts.append("")
-        user_prompt_parts.append(orchestration_hints_prompt)
-
-    return user_prompt_parts
+        notes.extend(("", orchestration_hints_prompt))
+    return notes
 
 
 def build_compose_role_prompt_parts(
@@ -327,12 +460,6 @@ def build_compose_role_prompt_parts(
     role_upper: str,
     role_detail: str,
     profile_info: str,
-    final_key: str,
-    bpm: float,
-    time_sig: str,
-    bars: int,
-    length_q: float,
-    selection_info: List[str],
 ) -> List[str]:
     user_prompt_parts = [
         f"## COMPOSE: {role_upper} for {profile.get('name', 'instrument')}",
@@ -341,21 +468,7 @@ def build_compose_role_prompt_parts(
     ]
     if role_detail:
         user_prompt_parts.append(role_detail)
-    user_prompt_parts.extend([
-        "",
-        *build_instrument_profile_lines(profile_info),
-        "",
-        *build_musical_context_lines(
-            final_key,
-            "",
-            bpm,
-            time_sig,
-            bars,
-            length_q,
-            selection_info,
-            include_scale_notes=False,
-        ),
-    ])
+    user_prompt_parts.extend(("", *build_instrument_profile_lines(profile_info)))
     return user_prompt_parts
 
 
@@ -363,45 +476,83 @@ def build_compose_type_prompt_parts(
     profile: Dict[str, Any],
     generation_style: str,
     generation_type: str,
-    type_hint: str,
-    mood_hint: str,
-    dynamics_hint: str,
+    generation_target: str,
     profile_info: str,
-    final_key: str,
-    scale_notes: str,
-    bpm: float,
-    time_sig: str,
-    bars: int,
-    length_q: float,
-    selection_info: List[str],
 ) -> List[str]:
-    user_prompt_parts = [
+    return [
         f"## COMPOSE: {generation_style.upper()} {generation_type.upper()} for {profile.get('name', 'instrument')}",
         "",
         *build_instrument_profile_lines(profile_info),
         "",
-        "### GENERATION TARGET (WHAT TO BUILD)",
-        f"1. PART TYPE ({generation_type}):",
-        type_hint,
-        "",
-        f"2. STYLE ({generation_style}):",
-        mood_hint,
-        "",
-        "3. DYNAMICS GOAL:",
-        dynamics_hint,
-        "",
-        *build_musical_context_lines(
-            final_key,
-            scale_notes,
-            bpm,
-            time_sig,
-            bars,
-            length_q,
-            selection_info,
-            include_scale_notes=True,
-        ),
+        generation_target,
     ]
-    return user_prompt_parts
+
+
+@lru_cache(maxsize=PITCH_RANGE_CACHE_SIZE)
+def format_allowed_range_line(pitch_low: int, pitch_high: int) -> str:
+    return f"- ALLOWED RANGE: {midi_to_note(pitch_low)} to {midi_to_note(pitch_high)}"
+
+
+def build_free_mode_rules(allowed_range_line: str, midi_channel: Any, max_dur_hint: str) -> str:
+    rules = FREE_MODE_RULES_TEMPLATE.format_map({
+        "allowed_range_line": allowed_range_line,
+        "midi_channel": midi_channel,
+    })
+    return f"{rules}\n{max_dur_hint}" if max_dur_hint else rules
+
+
+def build_composition_rules(
+    allowed_range_line: str,
+    min_notes: int,
+    max_notes: int,
+    midi_channel: Any,
+    articulation: str,
+    max_dur_hint: str,
+) -> str:
+    rules = COMPOSITION_RULES_TEMPLATE.format_map({
+        "allowed_range_line": allowed_range_line,
+        "min_notes": min_notes,
+        "max_notes": max_notes,
+        "midi_channel": midi_channel,
+    })
+    return "\n".join(filter(None, (
+        rules,
+        f"- Articulation: {articulation}" if articulation else "",
+        max_dur_hint,
+    )))
+
+
+def build_role_guidance_detail(
+    role_guidance_list: Any,
+    current_inst_index: Any,
+    instrument_names: Tuple[str, ...],
+) -> str:
+    if not is_non_empty_list(role_guidance_list):
+        return ""
+    for entry in role_guidance_list:
+        if not isinstance(entry, dict):
+            continue
+        entry_index = entry.get("instrument_index")
+        matched = False
+        if entry_index is not None and current_inst_index is not None:
+            try:
+                matched = int(entry_index) == int(current_inst_index)
+            except (TypeError, ValueError):
+                matched = False
+        if not matched:
+            inst_name = normalize_lower(entry.get("instrument"))
+            if not inst_name or inst_name not in instrument_names:
+                continue
+
+        guidance = normalize_text(entry.get("guidance") or entry.get("musical_intent"))
+        relationship = normalize_text(entry.get("relationship"))
+        register = normalize_text(entry.get("register"))
+        return "\n".join(filter(None, (
+            f"Register: {register}" if register else "",
+            guidance,
+            f"Relationship: {relationship}" if relationship else "",
+        )))
+    return ""
 
 
 def build_prompt(
@@ -410,90 +561,115 @@ def build_prompt(
     preset_name: Optional[str],
     preset_settings: Dict[str, Any],
     length_q: float,
-) -> Tuple[str, str]:
+) -> Tuple[str, List[PromptSegment]]:
     profile_ai = profile.get("ai", {})
+    profile_midi = profile.get("midi") or EMPTY_PROFILE_SECTION
+    profile_name = profile.get("name", "")
+    profile_family = profile.get("family", "")
     profile_system = profile_ai.get("system_prompt_template", "")
     profile_user = profile_ai.get("user_prompt_template", "")
     profile_range = profile.get("range", {})
     abs_range = profile_range.get("absolute")
     pref_range = profile_range.get("preferred")
 
+    music = request.music
+    time_sig = music.time_sig
+    bpm = music.bpm
+    midi_channel = profile_midi.get("channel", MIDI_CHAN_MIN)
     ensemble = request.ensemble
-    is_multi_instrument = bool(request.ensemble and request.ensemble.total_instruments > 1)
+    is_multi_instrument = bool(ensemble and ensemble.total_instruments > 1)
     is_arrangement_mode = bool(ensemble and ensemble.arrangement_mode)
     plan_data = ensemble.plan if (ensemble and isinstance(ensemble.plan, dict)) else {}
-    plan_chord_map = plan_data.get("chord_map") if isinstance(plan_data, dict) else None
+    plan_summary = (ensemble.plan_summary or "").strip() if ensemble else ""
+    plan_chord_map = plan_data.get("chord_map")
     has_plan_chord_map = is_non_empty_list(plan_chord_map)
     is_compose_ensemble = bool(
         ensemble
         and not is_arrangement_mode
-        and ((ensemble.plan_summary or "").strip() or has_plan_chord_map)
+        and (plan_summary or has_plan_chord_map)
     )
 
-    if request.free_mode:
+    quarters_per_bar, bars = get_selection_bars(time_sig, length_q)
+
+    free_mode = request.free_mode
+    if free_mode:
         generation_type = ""
+        generation_type_lower = ""
         min_notes, max_notes = FREE_MODE_MIN_NOTES, FREE_MODE_MAX_NOTES
+        articulation = ""
+        system_base = FREE_MODE_SYSTEM_PROMPT
     else:
         generation_type = request.generation_type or DEFAULT_GENERATION_TYPE
-        min_notes, max_notes, _ = estimate_note_count(
-            length_q, request.music.bpm, request.music.time_sig, generation_type
+        generation_type_lower = normalize_lower(generation_type)
+        min_notes, max_notes, _ = estimate_selection_note_count(
+            length_q,
+            quarters_per_bar,
+            generation_type_lower,
         )
-
-    values = {
-        "profile_name": profile.get("name", ""),
-        "profile_id": profile.get("id", ""),
-        "family": profile.get("family", ""),
-        "bpm": request.music.bpm,
-        "time_sig": request.music.time_sig,
-        "key": request.music.key,
-        "selection_quarters": round(length_q, SELECTION_QUARTERS_PRECISION),
-        "range_absolute": abs_range,
-        "range_preferred": pref_range,
-        "preset_name": preset_name or "",
-        "preset_settings": json.dumps(preset_settings, ensure_ascii=False),
-        "polyphony": profile.get("midi", {}).get("polyphony", ""),
-        "is_drum": profile.get("midi", {}).get("is_drum", False),
-        "channel": profile.get("midi", {}).get("channel", MIDI_CHAN_MIN),
-        "generation_type": generation_type,
-        "min_notes": min_notes,
-        "max_notes": max_notes,
-    }
+        articulation = resolve_prompt_articulation(profile, preset_settings)
+        system_base = BASE_SYSTEM_PROMPT
+
+    values: Dict[str, Any] = {}
+    if profile_user or profile_system:
+        values = {
+            "profile_name": profile_name,
+            "profile_id": profile.get("id", ""),
+            "family": profile_family,
+            "bpm": bpm,
+            "time_sig": time_sig,
+            "key": music.key,
+            "selection_quarters": round(length_q, SELECTION_QUARTERS_PRECISION),
+            "range_absolute": abs_range,
+            "range_preferred": pref_range,
+            "preset_name": preset_name or "",
+            "polyphony": profile_midi.get("polyphony", ""),
+            "is_drum": profile_midi.get("is_drum", False),
+            "channel": midi_channel,
+            "generation_type": generation_type,
+            "min_notes": min_notes,
+            "max_notes": max_notes,
+        }
+        if (
+            PRESET_SETTINGS_FIELD in get_template_fields(profile_user)
+            or PRESET_SETTINGS_FIELD in get_template_fields(profile_system)
+        ):
+            values[PRESET_SETTINGS_FIELD] = serialize_preset_settings(preset_settings)
 
     profile_user_formatted = format_profile_user_template(profile_user, values)
     _custom_curves, custom_curves_info = get_custom_curves_info(profile)
 
-    midi_channel = profile.get("midi", {}).get("channel", MIDI_CHAN_MIN)
     pitch_low, pitch_high = resolve_prompt_pitch_range(pref_range)
 
-    articulation = resolve_prompt_articulation(profile, preset_settings)
-
-    system_base = FREE_MODE_SYSTEM_PROMPT if request.free_mode else BASE_SYSTEM_PROMPT
     continuation_mode = request.continuation.mode if request.continuation else ""
     continuation_section_position = request.continuation.section_position if request.continuation else ""
     continuation_system_prompt = ""
     if request.continuation:
-        continuation_values = dict(values)
-        continuation_values["continuation_mode"] = continuation_mode
-        continuation_values["section_position"] = continuation_section_position
+        continuation_values = {
+            **values,
+            "continuation_mode": continuation_mode,
+            "section_position": continuation_section_position,
+        }
         continuation_system_prompt = safe_format(CONTINUATION_SYSTEM_PROMPT_TEMPLATE, continuation_values)
-    system_prompt = "\n\n".join([
-        p for p in (system_base, continuation_system_prompt, safe_format(profile_system, values)) if p
-    ])
+    system_prompt = "\n\n".join(filter(None, (
+        system_base,
+        continuation_system_prompt,
+        safe_format(profile_system, values) if profile_system else "",
+    )))
 
     skip_auto_harmony = is_arrangement_mode or has_plan_chord_map
 
     context_summary, detected_key, _position = build_context_summary(
         request.context,
-        request.music.time_sig,
+        time_sig,
         length_q,
-        request.music.key,
+        music.key,
         skip_auto_harmony=skip_auto_harmony,
         target_profile=profile,
         forced_position=continuation_section_position,
         continuation_mode=continuation_mode,
     )
 
-    final_key = request.music.key
+    final_key = music.key
     if final_key == UNKNOWN_VALUE and has_plan_chord_map:
         inferred_key = extract_key_from_chord_map(plan_chord_map)
         if inferred_key == UNKNOWN_VALUE:
@@ -501,28 +677,31 @@ def build_prompt(
         if inferred_key != UNKNOWN_VALUE:
             final_key = inferred_key
 
-    quarters_per_bar = get_quarters_per_bar(request.music.time_sig)
-    bars = max(MIN_BARS_COUNT, int(length_q / quarters_per_bar))
     selection_info = build_selection_info(length_q, quarters_per_bar, bars)
 
-    scale_notes = get_scale_note_names(final_key)
     profile_info = format_profile_for_prompt(profile)
 
-    if request.free_mode:
-        user_prompt_parts = build_free_mode_prompt_parts(
+    if free_mode:
+        intro_prompt_parts = build_free_mode_prompt_parts(
             profile,
             profile_user_formatted,
             custom_curves_info,
             profile_info,
-            final_key,
-            scale_notes,
-            request.music.bpm,
-            request.music.time_sig,
-            bars,
-            length_q,
-            selection_info,
-            is_multi_instrument,
         )
+        cache_intro = not (get_template_fields(profile_user) & REQUEST_TEMPLATE_FIELDS)
+        request_prompt_parts = [
+            *build_musical_context_lines(
+                final_key,
+                get_scale_note_names(final_key),
+                bpm,
+                time_sig,
+                bars,
+                length_q,
+                selection_info,
+                include_scale_notes=True,
+            ),
+            *build_free_mode_context_notes(profile, is_multi_instrument),
+        ]
     else:
         is_compose_or_arrange = is_compose_ensemble or is_arrangement_mode
         if is_compose_or_arrange and ensemble and isinstance(ensemble.current_instrument, dict):
@@ -534,315 +713,216 @@ def build_prompt(
             current_inst_index = None
             if current_inst:
                 current_inst_index = current_inst.get("index")
-            if current_inst_index is None and request.ensemble:
-                current_inst_index = request.ensemble.current_instrument_index
+            if current_inst_index is None and ensemble:
+                current_inst_index = ensemble.current_instrument_index
             if not current_role or normalize_lower(current_role) == UNKNOWN_VALUE:
                 current_role = extract_role_from_plan(
                     plan_data,
                     current_profile_name_str,
                     current_track,
                     current_inst_index,
-                    profile.get("family", ""),
+                    profile_family,
                 )
 
             current_role_upper = (
                 current_role.upper() if current_role and normalize_lower(current_role) != UNKNOWN_VALUE else UNKNOWN_ROLE_LABEL
             )
 
-            current_track_lower = normalize_lower(current_track)
-            current_profile_name_lower = normalize_lower(current_profile_name_str)
-            role_guidance_list = plan_data.get("role_guidance") if isinstance(plan_data, dict) else None
-            role_detail = ""
-            if is_non_empty_list(role_guidance_list):
-                profile_name_lower = normalize_lower(profile.get("name", ""))
-                for entry in role_guidance_list:
-                    if not isinstance(entry, dict):
-                        continue
-                    entry_index = entry.get("instrument_index")
-                    if entry_index is not None and current_inst_index is not None:
-                        try:
-                            if int(entry_index) == int(current_inst_index):
-                                matched = True
-                            else:
-                                matched = False
-                        except (TypeError, ValueError):
-                            matched = False
-                    else:
-                        matched = False
-                    if not matched:
-                        inst_name = normalize_lower(entry.get("instrument"))
-                        if not inst_name:
-                            continue
-                        matched = inst_name in (current_track_lower, current_profile_name_lower) or inst_name == profile_name_lower
-                    if not matched:
-                        continue
-
-                    guidance = normalize_text(entry.get("guidance") or entry.get("musical_intent"))
-                    relationship = normalize_text(entry.get("relationship"))
-                    register = normalize_text(entry.get("register"))
-                    details = []
-                    if register:
-                        details.append(f"Register: {register}")
-                    if guidance:
-                        details.append(guidance)
-                    if relationship:
-                        details.append(f"Relationship: {relationship}")
-                    role_detail = "\n".join(details).strip()
-                    break
-
-            user_prompt_parts = build_compose_role_prompt_parts(
+            role_detail = build_role_guidance_detail(
+                plan_data.get("role_guidance"),
+                current_inst_index,
+                (normalize_lower(current_track), normalize_lower(current_profile_name_str), normalize_lower(profile_name)),
+            )
+
+            intro_prompt_parts = build_compose_role_prompt_parts(
                 profile,
                 current_role_upper,
                 role_detail,
                 profile_info,
+            )
+            cache_intro = False
+            request_prompt_parts = build_musical_context_lines(
                 final_key,
-                request.music.bpm,
-                request.music.time_sig,
+                "",
+                bpm,
+                time_sig,
                 bars,
                 length_q,
                 selection_info,
+                include_scale_notes=False,
             )
         else:
             generation_style = request.generation_style or DEFAULT_GENERATION_STYLE
-            style_lower = generation_style.lower()
-            mood_hint = MOOD_HINTS.get(style_lower, DEFAULT_MOOD_HINT_TEMPLATE.format(style=generation_style))
-            dynamics_hint = DYNAMICS_HINTS.get(
-                style_lower,
-                DYNAMICS_HINTS.get("default", DEFAULT_DYNAMICS_HINT),
-            )
-            gen_lower = generation_type.lower()
-            type_hint = TYPE_HINTS.get(
-                gen_lower,
-                DEFAULT_TYPE_HINT_TEMPLATE.format(generation_type=generation_type),
-            )
-            user_prompt_parts = build_compose_type_prompt_parts(
+            generation_target = build_generation_target_block(generation_type, generation_style)
+            intro_prompt_parts = build_compose_type_prompt_parts(
                 profile,
                 generation_style,
                 generation_type,
-                type_hint,
-                mood_hint,
-                dynamics_hint,
+                generation_target,
                 profile_info,
+            )
+            cache_intro = True
+            request_prompt_parts = build_musical_context_lines(
                 final_key,
-                scale_notes,
-                request.music.bpm,
-                request.music.time_sig,
+                get_scale_note_names(final_key),
+                bpm,
+                time_sig,
                 bars,
                 length_q,
                 selection_info,
+                include_scale_notes=True,
             )
 
     if context_summary:
-        user_prompt_parts.append("")
-        user_prompt_parts.append(context_summary)
+        request_prompt_parts.extend(("", context_summary))
 
     continuation_prompt_lines = build_continuation_prompt(request.continuation, request.context, profile)
     if continuation_prompt_lines:
-        user_prompt_parts.append("")
-        user_prompt_parts.extend(continuation_prompt_lines)
+        request_prompt_parts.extend(("", *continuation_prompt_lines))
 
     full_selection_context = build_full_selection_context(
         request.context,
-        request.music.time_sig,
+        time_sig,
         length_q,
         profile,
     )
     if full_selection_context:
-        user_prompt_parts.append("")
-        user_prompt_parts.extend(full_selection_context)
+        request_prompt_parts.extend(("", *full_selection_context))
 
     ensemble_context = build_ensemble_context(
-        request.ensemble,
-        profile.get("name", ""),
-        request.music.time_sig,
+        ensemble,
+        profile_name,
+        time_sig,
         length_q,
         has_plan_chord_map=has_plan_chord_map,
     )
     if ensemble_context:
-        user_prompt_parts.append("")
-        user_prompt_parts.append(ensemble_context)
+        request_prompt_parts.extend(("", ensemble_context))
 
     if is_arrangement_mode:
         arrangement_context = build_arrangement_context(
-            request.ensemble,
-            profile.get("name", ""),
-            request.music.time_sig,
+            ensemble,
+            profile_name,
+            time_sig,
             length_q,
         )
         if arrangement_context:
-            user_prompt_parts.append("")
-            user_prompt_parts.append(arrangement_context)
+            request_prompt_parts.extend(("", arrangement_context))
 
     sketch_chord_map_str = ""
-    if is_arrangement_mode and request.ensemble.source_sketch:
-        sketch_notes = request.ensemble.source_sketch.get("notes", [])
+    if is_arrangement_mode and ensemble.source_sketch:
+        sketch_notes = ensemble.source_sketch.get("notes", [])
         if sketch_notes:
             sketch_chord_map_str, _ = build_chord_map_from_sketch(
                 sketch_notes,
-                request.music.time_sig,
+                time_sig,
                 length_q,
             )
 
-    if request.ensemble:
-        generation_progress = build_generation_progress(request.ensemble, profile.get("name", ""))
+    if ensemble:
+        generation_progress = build_generation_progress(ensemble, profile_name)
         if generation_progress:
-            user_prompt_parts.append("")
-            user_prompt_parts.append(generation_progress)
-
-        plan_summary = (request.ensemble.plan_summary or "").strip()
-        current_inst = request.ensemble.current_instrument if request.ensemble else None
-        current_family = normalize_lower(current_inst.get("family", "")) if current_inst else ""
-
-        append_plan_sections(
-            user_prompt_parts,
-            plan_data,
-            plan_summary,
-            is_arrangement_mode,
-            sketch_chord_map_str,
-            plan_chord_map,
-            pitch_low,
-            pitch_high,
-            current_family,
-        )
+            request_prompt_parts.extend(("", generation_progress))
 
-        generated_motif = request.ensemble.generated_motif if request.ensemble else None
-        current_role = request.ensemble.current_instrument.get("role", "") if request.ensemble.current_instrument else ""
-        append_generated_motif_section(user_prompt_parts, generated_motif, current_role)
+        has_plan_sections = False
+        if plan_data or plan_summary or sketch_chord_map_str:
+            current_inst = ensemble.current_instrument
+            current_family = normalize_lower(current_inst.get("family", "")) if current_inst else ""
+
+            has_plan_sections = append_plan_sections(
+                request_prompt_parts,
+                plan_data,
+                plan_summary,
+                is_arrangement_mode,
+                sketch_chord_map_str,
+                plan_chord_map,
+                pitch_low,
+                pitch_high,
+                current_family,
+            )
 
-    midi_to_note, _dur_q_to_name, _velocity_to_dynamic = import_music_notation()
+        generated_motif = ensemble.generated_motif
+        current_role = ensemble.current_instrument.get("role", "") if ensemble.current_instrument else ""
+        append_generated_motif_section(
+            request_prompt_parts,
+            generated_motif,
+            current_role,
+            after_plan_sections=has_plan_sections,
+        )
 
-    pitch_low_note = midi_to_note(pitch_low)
-    pitch_high_note = midi_to_note(pitch_high)
+    allowed_range_line = format_allowed_range_line(pitch_low, pitch_high)
 
-    family = normalize_lower(profile.get("family", ""))
-    is_wind_brass = family in WIND_BRASS_FAMILIES
-    wind_brass_max_dur = int(WIND_BRASS_MAX_NOTE_DUR_Q)
-    max_dur_hint = (
-        f"- MAX NOTE DURATION: {wind_brass_max_dur} beats (~2 bars) for wind/brass - split longer notes with breath rests"
-        if is_wind_brass else ""
-    )
+    max_dur_hint = WIND_BRASS_MAX_DUR_HINT if normalize_lower(profile_family) in WIND_BRASS_FAMILIES else ""
 
-    if request.free_mode:
-        free_mode_rules = [
-            "",
-            "### COMPOSITION RULES",
-            f"- ALLOWED RANGE: {pitch_low_note} to {pitch_high_note}",
-            f"- Channel: {midi_channel}",
-            "- Generate appropriate number of notes for the part type",
-        ]
-        if max_dur_hint:
-            free_mode_rules.append(max_dur_hint)
-        user_prompt_parts.extend(free_mode_rules)
-
-        user_prompt_parts.extend([
-            "",
-            "### YOUR CREATIVE CHOICES",
-            "- Choose generation TYPE based on user request or context (Melody, Arpeggio, Chords, Pad, Bass, etc.)",
-            "- Choose STYLE that fits (Heroic, Romantic, Dark, Cinematic, etc.)",
-            "- Articulations: use ONE for simple parts (pads, chords), MULTIPLE only for expressive melodic parts",
-            "",
-            "### THREE-LAYER DYNAMICS",
-            "1. DYNAMICS (dyn): Note attack intensity - p, mp, mf, f, ff",
-            "2. EXPRESSION CURVE (CC11): GLOBAL phrase arc across the part",
-            "3. DYNAMICS CURVE (CC1): PER-NOTE swells for sustained notes",
-            "",
-            "DYNAMICS CURVE (CC1) - CRITICAL:",
-            "- Values: 40-127 (40=pp, 64=mp, 80=mf, 100=f, 120=ff)",
-            "- Use 2-3 points per sustained note (start/peak/release)",
-            "- Smooth motion within each note (avoid jumps >20 within a note)",
-            "- Short notes can omit CC1; use velocity/dyn instead",
-            "- Follow DYNAMIC ARC with CC11 (global), not CC1",
-        ])
+    if free_mode:
+        request_prompt_parts.extend((
+            build_free_mode_rules(allowed_range_line, midi_channel, max_dur_hint),
+            FREE_MODE_CHOICES_AND_DYNAMICS_BLOCK,
+        ))
     else:
-        short_articulations = profile.get("articulations", {}).get("short_articulations", [])
-        is_short_art = bool(articulation) and normalize_lower(articulation) in [normalize_lower(a) for a in short_articulations]
-        velocity_hint = (
-            "Use dyn for note-to-note dynamics (accents: f-fff, normal: mf-f, soft: p-mp)"
-            if is_short_art else
-            "Vary dynamics for phrase shaping (peaks: f-ff, between: mf)"
-        )
-
-        composition_rules = [
-            "",
-            "### COMPOSITION RULES",
-            f"- ALLOWED RANGE: {pitch_low_note} to {pitch_high_note}",
-            f"- Suggested note count: {min_notes}-{max_notes} (adapt based on musical needs)",
-            f"- Channel: {midi_channel}",
-        ]
-        if articulation:
-            composition_rules.append(f"- Articulation: {articulation}")
-        if max_dur_hint:
-            composition_rules.append(max_dur_hint)
-        user_prompt_parts.extend(composition_rules)
-
-        user_prompt_parts.extend([
-            "",
-            "### THREE-LAYER DYNAMICS",
-            f"1. DYNAMICS: {velocity_hint}",
-            "2. EXPRESSION CURVE (CC11): GLOBAL phrase arc across the part",
-            "3. DYNAMICS CURVE (CC1): PER-NOTE swells for sustained notes",
-            "",
-            "DYNAMICS CURVE (CC1): Use 2-3 points per sustained note, smooth within each note",
-        ])
+        request_prompt_parts.extend((
+            build_composition_rules(allowed_range_line, min_notes, max_notes, midi_channel, articulation, max_dur_hint),
+            SHORT_ARTICULATION_DYNAMICS_BLOCK
+            if is_short_articulation(profile, articulation) else
+            LONG_ARTICULATION_DYNAMICS_BLOCK,
+        ))
 
     tempo_guidance = build_tempo_change_guidance(request, length_q)
     if tempo_guidance:
-        user_prompt_parts.append("")
-        user_prompt_parts.extend(tempo_guidance)
+        request_prompt_parts.extend(tempo_guidance)
 
-    pattern_guidance = build_pattern_guidance(profile, generation_type, bars)
+    pattern_guidance = build_pattern_guidance(profile, generation_type_lower, bars)
     if pattern_guidance:
-        user_prompt_parts.append("")
-        user_prompt_parts.extend(pattern_guidance)
+        request_prompt_parts.extend(pattern_guidance)
 
     user_prompt_text = normalize_text(fix_mojibake(request.user_prompt))
     if user_prompt_text:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("### USER REQUEST (PRIORITY - follow these instructions, they override defaults):")
-        user_prompt_parts.append(user_prompt_text)
-        user_prompt_parts.append("")
-        user_prompt_parts.append("INTERPRET USER REQUEST:")
-        user_prompt_parts.append("- If user asks for 'simple', 'basic', 'straightforward' → create simple, clean output")
-        user_prompt_parts.append("- If user mentions dynamics (crescendo, forte, soft, etc.) → apply to Expression curve (CC11) for overall, Dynamics curve (CC1) for per-note detail")
-        user_prompt_parts.append("- If user forbids spikes or caps max dynamics (e.g. 'cap at f, no ff') → enforce strictly in velocity/CC (no sfz, no sudden accents, no abrupt jumps)")
-        user_prompt_parts.append("- If user mentions a composer style (Zimmer, Williams, etc.) → match their typical approach")
-        user_prompt_parts.append("- If user asks for chords/pads → use sustained notes, minimal articulation changes")
-
-    if not request.free_mode:
+        request_prompt_parts.extend((USER_REQUEST_HEADER, user_prompt_text, USER_REQUEST_INTERPRETATION_BLOCK))
+
+    if free_mode:
+        if is_multi_instrument:
+            request_prompt_parts.append(HANDOFF_REQUIREMENT_BLOCK)
+    else:
         if profile_user_formatted:
-            user_prompt_parts.extend([
-                "",
-                "### INSTRUMENT-SPECIFIC RULES:",
-                profile_user_formatted,
-            ])
+            request_prompt_parts.append(f"{INSTRUMENT_RULES_HEADER}\n{profile_user_formatted}")
 
         if custom_curves_info:
-            user_prompt_parts.extend([
-                "",
-                "### INSTRUMENT CURVES (use these curve names):",
-                f"{custom_curves_info}",
-            ])
-
-    if request.free_mode and is_multi_instrument:
-        user_prompt_parts.extend([
-            "",
-            "### HANDOFF REQUIREMENT (MANDATORY for ensemble)",
-            "You MUST include a 'handoff' object in your JSON response.",
-            "This helps the next musician understand your contribution and find their place.",
-            "Focus on: what space you occupied, what you left open, and advice for the next instrument.",
-        ])
+            request_prompt_parts.append(f"{INSTRUMENT_CURVES_HEADER}\n{custom_curves_info}")
 
-    user_prompt_parts.extend([
-        "",
-        "### OUTPUT (valid JSON only):",
-    ])
+    request_prompt_parts.append(OUTPUT_TRAILER)
+
+    intro_prompt = "\n".join(intro_prompt_parts)
+    request_prompt = PROMPT_SEGMENT_SEPARATOR + "\n".join(request_prompt_parts)
+    if not cache_intro:
+        return system_prompt, [(intro_prompt + request_prompt, False)]
+    return system_prompt, [(intro_prompt, True), (request_prompt, False)]
 
-    user_prompt = "\n".join(user_prompt_parts)
-    return system_prompt, user_prompt
 
+def build_text_block(text: str, cacheable: bool) -> Dict[str, Any]:
+    if cacheable:
+        return {"type": "text", "text": text, "cache_control": {"type": CACHE_CONTROL_EPHEMERAL}}
+    return {"type": "text", "text": text}
 
-def build_chat_messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+
+def join_prompt_segments(segments: List[PromptSegment]) -> str:
+    return "".join(text for text, _cacheable in segments)
+
+
+def build_chat_messages(
+    system_prompt: str,
+    user_prompt: Union[str, List[PromptSegment]],
+    use_cache: bool = False,
+) -> List[Dict[str, Any]]:
+    segments = [(user_prompt, True)] if isinstance(user_prompt, str) else user_prompt
+    if not use_cache:
+        return [
+            {"role": SYSTEM_MESSAGE_ROLE, "content": system_prompt},
+            {"role": USER_MESSAGE_ROLE, "content": join_prompt_segments(segments)},
+        ]
     return [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
+        {"role": SYSTEM_MESSAGE_ROLE, "content": [build_text_block(system_prompt, True)]},
+        {
+            "role": USER_MESSAGE_ROLE,
+            "content": [build_text_block(text, cacheable) for text, cacheable in segments if text],
+        },
     ]
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from constants import QUARTERS_PER_WHOLE
+    from context_builder import get_quarters_per_bar
     from music_theory import detect_key_from_chords
     from prompt_builder_common import (
         BAR_RANGE_END_OFFSET,
@@ -25,6 +28,7 @@ try:
     )
 except ImportError:
     from .constants import QUARTERS_PER_WHOLE
+    from .context_builder import get_quarters_per_bar
     from .music_theory import detect_key_from_chords
     from .prompt_builder_common import (
         BAR_RANGE_END_OFFSET,
@@ -97,7 +101,7 @@ INTERVALS_DOM7 = [0, 4, 7, 10]
 INTERVALS_MINOR_TRIAD = [0, 3, 7]
 INTERVALS_MAJOR_TRIAD = [0, 4, 7]
 
-NOTE_DENSITY_RULES = [
+NOTE_DENSITY_RULES = (
     (("melody",), 2, 8, "moderate melodic density with varied rhythms"),
     (("arpeggio",), 8, 16, "continuous arpeggiated pattern"),
     (("bass",), 1, 4, "sparse but rhythmically strong bass notes"),
@@ -106,12 +110,24 @@ NOTE_DENSITY_RULES = [
     (("rhythm",), 4, 16, "rhythmic pattern with clear pulse"),
     (("counter",), 2, 6, "independent melodic line that complements the main melody"),
     (("accomp",), 2, 8, "supportive accompaniment pattern"),
-]
+)
+NOTE_DENSITY_TABLE = MappingProxyType({
+    keyword: (min_val, max_val, desc)
+    for keywords, min_val, max_val, desc in NOTE_DENSITY_RULES
+    for keyword in keywords
+})
+NOTE_DENSITY_KEYWORDS = tuple(NOTE_DENSITY_TABLE.items())
 DEFAULT_DENSITY_MIN = 2
 DEFAULT_DENSITY_MAX = 8
 DEFAULT_DENSITY_DESC = "appropriate musical content"
+DEFAULT_NOTE_DENSITY = (DEFAULT_DENSITY_MIN, DEFAULT_DENSITY_MAX, DEFAULT_DENSITY_DESC)
+NOTE_COUNT_CACHE_SIZE = 256
+NOTE_DENSITY_CACHE_SIZE = 64
+SELECTION_BARS_CACHE_SIZE = 128
+TIME_SIGNATURE_CACHE_SIZE = 32
 
 
+@lru_cache(maxsize=TIME_SIGNATURE_CACHE_SIZE)
 def split_time_signature(time_sig: str) -> Tuple[int, int]:
     if not time_sig:
         return DEFAULT_BEATS_PER_BAR, DEFAULT_BEAT_UNIT
@@ -122,6 +138,12 @@ def split_time_signature(time_sig: str) -> Tuple[int, int]:
         return DEFAULT_BEATS_PER_BAR, DEFAULT_BEAT_UNIT
 
 
+@lru_cache(maxsize=SELECTION_BARS_CACHE_SIZE)
+def get_selection_bars(time_sig: str, length_q: float) -> Tuple[float, int]:
+    quarters_per_bar = get_quarters_per_bar(time_sig)
+    return quarters_per_bar, max(MIN_BARS_COUNT, int(length_q / quarters_per_bar))
+
+
 def parse_chord_root(chord_name: str) -> Tuple[str, int, str]:
     chord_str = normalize_text(chord_name)
     if not chord_str:
@@ -159,9 +181,7 @@ def extract_key_from_chord_map(chord_map: Optional[List[Dict[str, Any]]]) -> str
 
 
 def bar_to_time_q(bar: int, time_sig: str = DEFAULT_TIME_SIGNATURE) -> float:
-    num, denom = split_time_signature(time_sig)
-    quarters_per_bar = num * (QUARTERS_PER_WHOLE / denom)
-    return (bar - DEFAULT_BAR_INDEX) * quarters_per_bar
+    return (bar - DEFAULT_BAR_INDEX) * get_quarters_per_bar(time_sig)
 
 
 def bars_range_to_time_q(bars_str: str, time_sig: str = DEFAULT_TIME_SIGNATURE) -> Tuple[float, float]:
@@ -225,25 +245,37 @@ def get_chord_tones_from_name(chord_name: str) -> List[int]:
     return [(root_pc + i) % SEMITONES_PER_OCTAVE for i in intervals]
 
 
+@lru_cache(maxsize=NOTE_DENSITY_CACHE_SIZE)
+def resolve_note_density(generation_type: str) -> Tuple[int, int, str]:
+    gen_type_lower = normalize_lower(generation_type)
+    density = NOTE_DENSITY_TABLE.get(gen_type_lower)
+    if density is not None:
+        return density
+    return next(
+        (density for keyword, density in NOTE_DENSITY_KEYWORDS if keyword in gen_type_lower),
+        DEFAULT_NOTE_DENSITY,
+    )
+
+
 def estimate_note_count(length_q: float, bpm: float, time_sig: str, generation_type: str) -> Tuple[int, int, str]:
     """Estimate recommended note count based on musical context."""
-    beats_per_bar, beat_unit = split_time_signature(time_sig)
+    return estimate_selection_note_count(
+        length_q,
+        get_quarters_per_bar(time_sig),
+        normalize_lower(generation_type),
+    )
 
-    quarters_per_bar = beats_per_bar * (QUARTERS_PER_WHOLE / beat_unit)
+
+@lru_cache(maxsize=NOTE_COUNT_CACHE_SIZE)
+def estimate_selection_note_count(
+    length_q: float,
+    quarters_per_bar: float,
+    generation_type: str,
+) -> Tuple[int, int, str]:
     bars = length_q / quarters_per_bar if quarters_per_bar > 0 else length_q / QUARTERS_PER_WHOLE
     bars = max(MIN_BARS_COUNT, bars)
 
-    gen_type_lower = normalize_lower(generation_type)
-    notes_per_bar_min = DEFAULT_DENSITY_MIN
-    notes_per_bar_max = DEFAULT_DENSITY_MAX
-    density_desc = DEFAULT_DENSITY_DESC
-
-    for keywords, min_val, max_val, desc in NOTE_DENSITY_RULES:
-        if any(k in gen_type_lower for k in keywords):
-            notes_per_bar_min = min_val
-            notes_per_bar_max = max_val
-            density_desc = desc
-            break
+    notes_per_bar_min, notes_per_bar_max, density_desc = resolve_note_density(generation_type)
 
     min_notes = max(MIN_NOTES_COUNT, int(bars * notes_per_bar_min))
     max_notes = max(min_notes + MIN_MAX_NOTES_DELTA, int(bars * notes_per_bar_max))
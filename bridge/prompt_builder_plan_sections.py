@@ -1,38 +1,39 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     from constants import DEFAULT_PITCH, DEFAULT_VELOCITY
+    from midi_utils import note_to_midi
     from prompt_builder_utils import (
         UNKNOWN_VALUE,
         get_chord_tones_from_name,
         import_music_notation,
-        import_note_to_midi,
         is_non_empty_list,
         normalize_lower,
         normalize_text,
     )
 except ImportError:
     from .constants import DEFAULT_PITCH, DEFAULT_VELOCITY
+    from .midi_utils import note_to_midi
     from .prompt_builder_utils import (
         UNKNOWN_VALUE,
         get_chord_tones_from_name,
         import_music_notation,
-        import_note_to_midi,
         is_non_empty_list,
         normalize_lower,
         normalize_text,
     )
 
 
-TREND_SYMBOLS = {
+TREND_SYMBOLS = MappingProxyType({
     "building": "↗",
     "climax": "★",
     "fading": "↘",
     "resolving": "↓",
     "stable": "→",
-}
+})
 STRONG_ACCENT = "strong"
 MEDIUM_ACCENT = "medium"
 ACCENT_STRONG_LIMIT = 12
@@ -62,6 +63,69 @@ DEFAULT_NOTE_DUR_Q = 1.0
 MIN_INTERVAL_NOTES = 2
 INTERVAL_START_INDEX = 1
 
+COMPOSITION_PLAN_SECTION_HEADER = "\n### COMPOSITION PLAN (MANDATORY - FOLLOW EXACTLY)"
+SKETCH_CHORD_MAP_HEADER = "\n**CHORD MAP (AUTO-DETECTED FROM SKETCH - MANDATORY):**"
+SKETCH_CHORD_MAP_FOOTER = "\n".join([
+    "This harmonic structure was detected from the source sketch.",
+    "Use it as the harmonic foundation for your arrangement.",
+])
+CHORD_MAP_TABLE_HEADER = "\n".join([
+    "",
+    "**CHORD MAP (MANDATORY - USE THESE EXACT NOTES):**",
+    "```",
+    "Bar.Beat | Chord        | Notes for YOUR range",
+    "---------|--------------|---------------------",
+])
+CHORD_MAP_TABLE_FOOTER = "\n".join([
+    "```",
+    "",
+    "Use this harmonic structure. How you use it depends on the musical context and style.",
+])
+DYNAMIC_ARC_TABLE_HEADER = "\n".join([
+    "",
+    "**DYNAMIC ARC (MANDATORY - FOLLOW THIS INTENSITY CURVE):**",
+    "```",
+    "Bar   | Dynamics | Trend",
+    "------|----------|-------",
+])
+DYNAMIC_ARC_RULES_BLOCK = "\n".join([
+    "```",
+    "DYNAMIC ARC RULES:",
+    "- Match the dynamics level at each bar",
+    "- 'building': gradually increase intensity toward next point",
+    "- 'climax': peak intensity, strongest notes",
+    "- 'fading'/'resolving': decrease intensity",
+])
+TEXTURE_MAP_HEADER = "\n**TEXTURE MAP (WHEN TO PLAY/REST):**"
+TEXTURE_RULES_BLOCK = "\n".join([
+    "",
+    "TEXTURE RULES:",
+    "- TACET sections: output empty notes array for those bars",
+    "- 'sparse': leave lots of space, few notes",
+    "- 'full'/'tutti': all instruments active, denser writing",
+])
+PHRASE_STRUCTURE_HEADER = "\n**PHRASE STRUCTURE (BREATHING & CADENCES):**"
+ACCENT_MAP_HEADER = "\n**ACCENT MAP (RHYTHMIC SYNC):**"
+MOTIF_BLUEPRINT_HEADER = "\n**MOTIF BLUEPRINT:**"
+MOTIF_RULE_BLOCK = "\nMOTIF RULE: MELODY role should establish this motif, others respond/develop it"
+SECTION_OVERVIEW_HEADER = "\n**SECTION OVERVIEW:**"
+ROLE_ASSIGNMENTS_HEADER = "\n**ROLE ASSIGNMENTS:**"
+ESTABLISHED_MOTIF_HEADER = "### ESTABLISHED MOTIF (from melody instrument - RESPOND TO THIS)"
+MOTIF_NOTES_TABLE_HEADER = "\n".join([
+    "**Motif notes:**",
+    "```",
+    "Beat | Note    | Duration  | Dynamics",
+    "-----|---------|-----------|--------",
+])
+MOTIF_ROLE_TASKS = MappingProxyType({
+    ROLE_MELODY: "YOUR TASK: You ARE the motif carrier. Develop/vary this motif.",
+    ROLE_BASS: "YOUR TASK: Support the motif rhythm with root notes on strong beats.",
+    ROLE_HARMONY: "YOUR TASK: Provide harmonic backdrop that frames this motif.",
+    ROLE_PAD: "YOUR TASK: Provide harmonic backdrop that frames this motif.",
+    ROLE_COUNTERMELODY: "YOUR TASK: Create a complementary line that answers this motif.",
+})
+DEFAULT_MOTIF_ROLE_TASK = "YOUR TASK: Complement this motif - don't duplicate it, respond to it."
+
 
 def format_interval_list(intervals: List[Any]) -> str:
     int_vals = []
@@ -75,7 +139,7 @@ def format_interval_list(intervals: List[Any]) -> str:
     return ", ".join(f"{v:+d}" for v in int_vals)
 
 
-def format_rhythm_pattern(rhythm: List[Any], dur_q_to_name) -> str:
+def format_rhythm_pattern(rhythm: List[Any], dur_q_to_name: Callable[..., str]) -> str:
     try:
         rhythm_names = [dur_q_to_name(float(r), abbrev=False) for r in rhythm]
     except (TypeError, ValueError):
@@ -83,6 +147,70 @@ def format_rhythm_pattern(rhythm: List[Any], dur_q_to_name) -> str:
     return INTERVAL_ARROW.join(rhythm_names)
 
 
+def format_dynamic_arc_row(dyn_entry: Dict[str, Any]) -> str:
+    bar = dyn_entry.get("bar", DEFAULT_BAR)
+    level = dyn_entry.get("level", DEFAULT_DYNAMIC_LEVEL)
+    trend = dyn_entry.get("trend", DEFAULT_TREND)
+    trend_arrow = TREND_SYMBOLS.get(trend, TREND_SYMBOLS[DEFAULT_TREND])
+    return f"Bar {bar:<2} | {level:<8} | {trend_arrow} {trend}"
+
+
+def format_accent_positions(accents: List[Dict[str, Any]]) -> str:
+    return ", ".join(f"Bar {a.get('bar', DEFAULT_BAR)}.{a.get('beat', DEFAULT_BEAT)}" for a in accents)
+
+
+def plan_entries(value: Any) -> List[Dict[str, Any]]:
+    if not isinstance(value, list):
+        return []
+    return [entry for entry in value if isinstance(entry, dict)]
+
+
+def split_accents(accents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    strong: List[Dict[str, Any]] = []
+    medium: List[Dict[str, Any]] = []
+    for accent in accents:
+        strength = accent.get("strength")
+        if strength == STRONG_ACCENT and len(strong) < ACCENT_STRONG_LIMIT:
+            strong.append(accent)
+        elif strength == MEDIUM_ACCENT and len(medium) < ACCENT_MEDIUM_LIMIT:
+            medium.append(accent)
+        elif len(strong) >= ACCENT_STRONG_LIMIT and len(medium) >= ACCENT_MEDIUM_LIMIT:
+            break
+    return strong, medium
+
+
+def format_chord_map_row(
+    chord_entry: Dict[str, Any],
+    pitch_low: int,
+    pitch_high: int,
+    midi_to_note: Callable[[int], str],
+) -> str:
+    bar = chord_entry.get("bar", DEFAULT_BAR)
+    beat = chord_entry.get("beat", DEFAULT_BEAT)
+    chord = chord_entry.get("chord", "?")
+    roman = chord_entry.get("roman", "")
+    chord_tones = chord_entry.get("chord_tones", [])
+
+    if not chord_tones and chord != "?":
+        chord_tones = get_chord_tones_from_name(chord)
+
+    notes_in_range = []
+    for pc in chord_tones:
+        try:
+            pc_int = int(pc) % SEMITONES_PER_OCTAVE
+        except (TypeError, ValueError):
+            continue
+        for octave in range(OCTAVE_MIN, OCTAVE_MAX_EXCLUSIVE):
+            midi_pitch = pc_int + (octave + OCTAVE_BASE_OFFSET) * SEMITONES_PER_OCTAVE
+            if pitch_low <= midi_pitch <= pitch_high:
+                notes_in_range.append(midi_to_note(midi_pitch))
+                break
+
+    notes_str = ", ".join(notes_in_range[:NOTES_PREVIEW_LIMIT]) if notes_in_range else chord
+    chord_label = f"{chord} ({roman})" if roman else chord
+    return f"{bar}.{beat:<4}    | {chord_label:<12} | {notes_str}"
+
+
 def append_plan_sections(
     user_prompt_parts: List[str],
     plan_data: Dict[str, Any],
@@ -93,97 +221,55 @@ def append_plan_sections(
     pitch_low: int,
     pitch_high: int,
     current_family: str,
-) -> None:
-    section_overview = plan_data.get("section_overview") if isinstance(plan_data, dict) else None
-    role_guidance = plan_data.get("role_guidance") if isinstance(plan_data, dict) else None
-    phrase_structure = plan_data.get("phrase_structure") if isinstance(plan_data, dict) else None
-    accent_map = plan_data.get("accent_map") if isinstance(plan_data, dict) else None
-    motif_blueprint = plan_data.get("motif_blueprint") if isinstance(plan_data, dict) else None
+) -> bool:
+    if not isinstance(plan_data, dict) or not plan_data:
+        if not (plan_summary or sketch_chord_map_str):
+            return False
+        plan_data = {}
+
+    section_overview = plan_data.get("section_overview")
+    role_guidance = plan_data.get("role_guidance")
+    phrase_structure = plan_data.get("phrase_structure")
+    accent_map = plan_data.get("accent_map")
+    motif_blueprint = plan_data.get("motif_blueprint")
 
     has_plan_content = plan_summary or section_overview or role_guidance or phrase_structure
     if not (has_plan_content or sketch_chord_map_str):
-        return
+        return False
 
-    user_prompt_parts.append("")
-    user_prompt_parts.append("### COMPOSITION PLAN (MANDATORY - FOLLOW EXACTLY)")
+    user_prompt_parts.append(COMPOSITION_PLAN_SECTION_HEADER)
     if plan_summary:
         user_prompt_parts.append(plan_summary)
 
     if is_arrangement_mode and sketch_chord_map_str:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**CHORD MAP (AUTO-DETECTED FROM SKETCH - MANDATORY):**")
-        user_prompt_parts.append(sketch_chord_map_str)
-        user_prompt_parts.append("This harmonic structure was detected from the source sketch.")
-        user_prompt_parts.append("Use it as the harmonic foundation for your arrangement.")
+        user_prompt_parts.extend((SKETCH_CHORD_MAP_HEADER, sketch_chord_map_str, SKETCH_CHORD_MAP_FOOTER))
     elif is_non_empty_list(chord_map):
         midi_to_note, _dur_q_to_name, _velocity_to_dynamic = import_music_notation()
 
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**CHORD MAP (MANDATORY - USE THESE EXACT NOTES):**")
-        user_prompt_parts.append("```")
-        user_prompt_parts.append("Bar.Beat | Chord        | Notes for YOUR range")
-        user_prompt_parts.append("---------|--------------|---------------------")
-        for chord_entry in chord_map:
-            if not isinstance(chord_entry, dict):
-                continue
-            bar = chord_entry.get("bar", DEFAULT_BAR)
-            beat = chord_entry.get("beat", DEFAULT_BEAT)
-            chord = chord_entry.get("chord", "?")
-            roman = chord_entry.get("roman", "")
-            chord_tones = chord_entry.get("chord_tones", [])
+        user_prompt_parts.append(CHORD_MAP_TABLE_HEADER)
+        chord_rows = "\n".join(
+            format_chord_map_row(chord_entry, pitch_low, pitch_high, midi_to_note)
+            for chord_entry in plan_entries(chord_map)
+        )
+        if chord_rows:
+            user_prompt_parts.append(chord_rows)
+        user_prompt_parts.append(CHORD_MAP_TABLE_FOOTER)
 
-            if not chord_tones and chord != "?":
-                chord_tones = get_chord_tones_from_name(chord)
-
-            notes_in_range = []
-            for pc in chord_tones:
-                try:
-                    pc_int = int(pc) % SEMITONES_PER_OCTAVE
-                except (TypeError, ValueError):
-                    continue
-                for octave in range(OCTAVE_MIN, OCTAVE_MAX_EXCLUSIVE):
-                    midi_pitch = pc_int + (octave + OCTAVE_BASE_OFFSET) * SEMITONES_PER_OCTAVE
-                    if pitch_low <= midi_pitch <= pitch_high:
-                        notes_in_range.append(midi_to_note(midi_pitch))
-                        break
-
-            notes_str = ", ".join(notes_in_range[:NOTES_PREVIEW_LIMIT]) if notes_in_range else chord
-            chord_label = f"{chord} ({roman})" if roman else chord
-            user_prompt_parts.append(f"{bar}.{beat:<4}    | {chord_label:<12} | {notes_str}")
-        user_prompt_parts.append("```")
-        user_prompt_parts.append("")
-        user_prompt_parts.append("Use this harmonic structure. How you use it depends on the musical context and style.")
-
-    dynamic_arc = plan_data.get("dynamic_arc") if isinstance(plan_data, dict) else None
+    dynamic_arc = plan_data.get("dynamic_arc")
     if is_non_empty_list(dynamic_arc):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**DYNAMIC ARC (MANDATORY - FOLLOW THIS INTENSITY CURVE):**")
-        user_prompt_parts.append("```")
-        user_prompt_parts.append("Bar   | Dynamics | Trend")
-        user_prompt_parts.append("------|----------|-------")
-        for dyn_entry in dynamic_arc:
-            if not isinstance(dyn_entry, dict):
-                continue
-            bar = dyn_entry.get("bar", DEFAULT_BAR)
-            level = dyn_entry.get("level", DEFAULT_DYNAMIC_LEVEL)
-            trend = dyn_entry.get("trend", DEFAULT_TREND)
-            trend_arrow = TREND_SYMBOLS.get(trend, TREND_SYMBOLS[DEFAULT_TREND])
-            user_prompt_parts.append(f"Bar {bar:<2} | {level:<8} | {trend_arrow} {trend}")
-        user_prompt_parts.append("```")
-        user_prompt_parts.append("DYNAMIC ARC RULES:")
-        user_prompt_parts.append("- Match the dynamics level at each bar")
-        user_prompt_parts.append("- 'building': gradually increase intensity toward next point")
-        user_prompt_parts.append("- 'climax': peak intensity, strongest notes")
-        user_prompt_parts.append("- 'fading'/'resolving': decrease intensity")
-
-    texture_map = plan_data.get("texture_map") if isinstance(plan_data, dict) else None
+        user_prompt_parts.append(DYNAMIC_ARC_TABLE_HEADER)
+        dynamic_rows = "\n".join(
+            format_dynamic_arc_row(dyn_entry) for dyn_entry in plan_entries(dynamic_arc)
+        )
+        if dynamic_rows:
+            user_prompt_parts.append(dynamic_rows)
+        user_prompt_parts.append(DYNAMIC_ARC_RULES_BLOCK)
+
+    texture_map = plan_data.get("texture_map")
     current_family_lower = normalize_lower(current_family)
     if is_non_empty_list(texture_map):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**TEXTURE MAP (WHEN TO PLAY/REST):**")
-        for tex_entry in texture_map:
-            if not isinstance(tex_entry, dict):
-                continue
+        user_prompt_parts.append(TEXTURE_MAP_HEADER)
+        for tex_entry in plan_entries(texture_map):
             tex_bars = tex_entry.get("bars", "")
             density = tex_entry.get("density", DEFAULT_TEXTURE_DENSITY)
             active_fam = tex_entry.get("active_families", [])
@@ -205,18 +291,11 @@ def append_plan_sections(
             if is_tacet:
                 user_prompt_parts.append(f"    → Generate NO NOTES for bars {tex_bars}!")
 
-        user_prompt_parts.append("")
-        user_prompt_parts.append("TEXTURE RULES:")
-        user_prompt_parts.append("- TACET sections: output empty notes array for those bars")
-        user_prompt_parts.append("- 'sparse': leave lots of space, few notes")
-        user_prompt_parts.append("- 'full'/'tutti': all instruments active, denser writing")
+        user_prompt_parts.append(TEXTURE_RULES_BLOCK)
 
     if is_non_empty_list(phrase_structure):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**PHRASE STRUCTURE (BREATHING & CADENCES):**")
-        for phrase in phrase_structure:
-            if not isinstance(phrase, dict):
-                continue
+        user_prompt_parts.append(PHRASE_STRUCTURE_HEADER)
+        for phrase in plan_entries(phrase_structure):
             name = phrase.get("name", DEFAULT_PHRASE_NAME)
             bars = phrase.get("bars", "")
             function = phrase.get("function", "")
@@ -233,12 +312,9 @@ def append_plan_sections(
                 cad_bar = cadence.get("bar", "")
                 if cad_type and cad_bar:
                     user_prompt_parts.append(f"    Cadence: {cad_type} at bar {cad_bar}")
-            if breathe_at:
-                breath_str = ", ".join(str(b) for b in breathe_at)
-                user_prompt_parts.append(f"    Breathe at: {breath_str}")
-            elif breathing:
-                breath_str = ", ".join(str(b) for b in breathing)
-                user_prompt_parts.append(f"    Breathe at: {breath_str}")
+            breath_points = breathe_at or breathing
+            if breath_points:
+                user_prompt_parts.append(f"    Breathe at: {', '.join(map(str, breath_points))}")
             if isinstance(climax, dict) and climax:
                 climax_bar = climax.get("bar", "")
                 intensity = climax.get("intensity", "")
@@ -246,38 +322,18 @@ def append_plan_sections(
                     user_prompt_parts.append(f"    Climax: Bar {climax_bar} ({intensity})")
 
     if is_non_empty_list(accent_map):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**ACCENT MAP (RHYTHMIC SYNC):**")
-        strong_accents = [
-            a for a in accent_map
-            if isinstance(a, dict) and a.get("strength") == STRONG_ACCENT
-        ]
+        user_prompt_parts.append(ACCENT_MAP_HEADER)
+        strong_accents, medium_accents = split_accents(plan_entries(accent_map))
         if strong_accents:
-            accent_strs = []
-            for a in strong_accents[:ACCENT_STRONG_LIMIT]:
-                bar = a.get("bar", DEFAULT_BAR)
-                beat = a.get("beat", DEFAULT_BEAT)
-                accent_strs.append(f"Bar {bar}.{beat}")
-            user_prompt_parts.append(f"- STRONG accents (all instruments): {', '.join(accent_strs)}")
+            user_prompt_parts.append(f"- STRONG accents (all instruments): {format_accent_positions(strong_accents)}")
             user_prompt_parts.append("  → Place notes ON these beats, use f-ff dynamics")
-        medium_accents = [
-            a for a in accent_map
-            if isinstance(a, dict) and a.get("strength") == MEDIUM_ACCENT
-        ]
         if medium_accents:
-            accent_strs = []
-            for a in medium_accents[:ACCENT_MEDIUM_LIMIT]:
-                bar = a.get("bar", DEFAULT_BAR)
-                beat = a.get("beat", DEFAULT_BEAT)
-                accent_strs.append(f"Bar {bar}.{beat}")
-            user_prompt_parts.append(f"- MEDIUM accents (optional): {', '.join(accent_strs)}")
+            user_prompt_parts.append(f"- MEDIUM accents (optional): {format_accent_positions(medium_accents)}")
 
     if isinstance(motif_blueprint, dict) and motif_blueprint:
         midi_to_note, dur_q_to_name, _velocity_to_dynamic = import_music_notation()
-        note_to_midi = import_note_to_midi()
 
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**MOTIF BLUEPRINT:**")
+        user_prompt_parts.append(MOTIF_BLUEPRINT_HEADER)
         description = motif_blueprint.get("description", "")
         character = motif_blueprint.get("character", "")
         intervals = motif_blueprint.get("intervals", [])
@@ -334,82 +390,72 @@ def append_plan_sections(
         if techniques:
             user_prompt_parts.append(f"- Development: {', '.join(techniques)}")
 
-        user_prompt_parts.append("")
-        user_prompt_parts.append("MOTIF RULE: MELODY role should establish this motif, others respond/develop it")
+        user_prompt_parts.append(MOTIF_RULE_BLOCK)
 
     if is_non_empty_list(section_overview):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**SECTION OVERVIEW:**")
-        for entry in section_overview:
-            if not isinstance(entry, dict):
-                continue
-            section_bars = normalize_text(entry.get("bars"))
-            section_type = normalize_text(entry.get("type"))
-            texture = normalize_text(entry.get("texture"))
-            dynamics = normalize_text(entry.get("dynamics"))
-            energy = normalize_text(entry.get("energy"))
-            active = entry.get("active_instruments", [])
-            tacet = entry.get("tacet_instruments", [])
-
-            parts_line = []
-            if section_bars:
-                parts_line.append(f"Bars {section_bars}")
-            if section_type:
-                parts_line.append(f"[{section_type.upper()}]")
-            if texture:
-                parts_line.append(f"texture: {texture}")
-            if dynamics:
-                parts_line.append(f"dynamics: {dynamics}")
-            if energy:
-                parts_line.append(f"energy: {energy}")
-            if parts_line:
-                user_prompt_parts.append(f"- " + " | ".join(parts_line))
-            if active:
-                user_prompt_parts.append(f"    Active: {', '.join(str(i) for i in active)}")
-            if tacet:
-                user_prompt_parts.append(f"    Tacet: {', '.join(str(i) for i in tacet)}")
+        user_prompt_parts.append(SECTION_OVERVIEW_HEADER)
+        for entry in plan_entries(section_overview):
+            get = entry.get
+            section_bars = normalize_text(get("bars"))
+            section_type = normalize_text(get("type"))
+            texture = normalize_text(get("texture"))
+            dynamics = normalize_text(get("dynamics"))
+            energy = normalize_text(get("energy"))
+            active = get("active_instruments", [])
+            tacet = get("tacet_instruments", [])
+
+            summary = " | ".join(filter(None, (
+                f"Bars {section_bars}" if section_bars else "",
+                f"[{section_type.upper()}]" if section_type else "",
+                f"texture: {texture}" if texture else "",
+                f"dynamics: {dynamics}" if dynamics else "",
+                f"energy: {energy}" if energy else "",
+            )))
+            section_block = "\n".join(filter(None, (
+                f"- {summary}" if summary else "",
+                f"    Active: {', '.join(map(str, active))}" if active else "",
+                f"    Tacet: {', '.join(map(str, tacet))}" if tacet else "",
+            )))
+            if section_block:
+                user_prompt_parts.append(section_block)
 
     if is_non_empty_list(role_guidance):
-        user_prompt_parts.append("")
-        user_prompt_parts.append("**ROLE ASSIGNMENTS:**")
-        for entry in role_guidance:
-            if not isinstance(entry, dict):
-                continue
-            instrument = normalize_text(entry.get("instrument"))
-            role = normalize_text(entry.get("role"))
-            register = normalize_text(entry.get("register"))
-            guidance = normalize_text(entry.get("guidance") or entry.get("musical_intent"))
-            relationship = normalize_text(entry.get("relationship"))
-            instrument_index = entry.get("instrument_index")
-
+        user_prompt_parts.append(ROLE_ASSIGNMENTS_HEADER)
+        for entry in plan_entries(role_guidance):
+            get = entry.get
+            instrument = normalize_text(get("instrument"))
+            instrument_index = get("instrument_index")
             if not instrument and instrument_index is None:
                 continue
+            role = normalize_text(get("role"))
+            register = normalize_text(get("register"))
+            guidance = normalize_text(get("guidance") or get("musical_intent"))
+            relationship = normalize_text(get("relationship"))
+
             label = instrument if instrument else "Instrument"
             if instrument_index is not None:
                 label = f"{instrument_index}. {label}"
-            line = f"- **{label}**"
-            if role:
-                line += f" → {role.upper()}"
-            if register:
-                line += f" ({register} register)"
-            user_prompt_parts.append(line)
-            if guidance:
-                user_prompt_parts.append(f"    {guidance}")
-            if relationship:
-                user_prompt_parts.append(f"    Relationship: {relationship}")
+            user_prompt_parts.append("".join((
+                f"- **{label}**",
+                f" → {role.upper()}" if role else "",
+                f" ({register} register)" if register else "",
+                f"\n    {guidance}" if guidance else "",
+                f"\n    Relationship: {relationship}" if relationship else "",
+            )))
 
-    user_prompt_parts.append("")
+    return True
 
 
 def append_generated_motif_section(
     user_prompt_parts: List[str],
     generated_motif: Dict[str, Any],
     current_role: str,
+    after_plan_sections: bool = False,
 ) -> None:
     if not isinstance(generated_motif, dict) or not generated_motif:
         return
 
-    user_prompt_parts.append("### ESTABLISHED MOTIF (from melody instrument - RESPOND TO THIS)")
+    user_prompt_parts.append(f"\n{ESTABLISHED_MOTIF_HEADER}" if after_plan_sections else ESTABLISHED_MOTIF_HEADER)
     source = generated_motif.get("source_instrument", DEFAULT_MOTIF_SOURCE)
     user_prompt_parts.append(f"**Source:** {source}")
 
@@ -417,10 +463,7 @@ def append_generated_motif_section(
     if motif_notes:
         midi_to_note, dur_q_to_name, velocity_to_dynamic = import_music_notation()
 
-        user_prompt_parts.append("**Motif notes:**")
-        user_prompt_parts.append("```")
-        user_prompt_parts.append("Beat | Note    | Duration  | Dynamics")
-        user_prompt_parts.append("-----|---------|-----------|--------")
+        user_prompt_parts.append(MOTIF_NOTES_TABLE_HEADER)
         for note in motif_notes[:MOTIF_NOTES_LIMIT]:
             if isinstance(note, dict):
                 start_q = note.get("start_q", DEFAULT_START_Q)
@@ -450,15 +493,4 @@ def append_generated_motif_section(
         user_prompt_parts.append(f"**Character:** {character}")
 
     current_role_lower = normalize_lower(current_role) if current_role else UNKNOWN_VALUE
-    user_prompt_parts.append("")
-    if current_role_lower == ROLE_MELODY:
-        user_prompt_parts.append("YOUR TASK: You ARE the motif carrier. Develop/vary this motif.")
-    elif current_role_lower == ROLE_BASS:
-        user_prompt_parts.append("YOUR TASK: Support the motif rhythm with root notes on strong beats.")
-    elif current_role_lower in {ROLE_HARMONY, ROLE_PAD}:
-        user_prompt_parts.append("YOUR TASK: Provide harmonic backdrop that frames this motif.")
-    elif current_role_lower == ROLE_COUNTERMELODY:
-        user_prompt_parts.append("YOUR TASK: Create a complementary line that answers this motif.")
-    else:
-        user_prompt_parts.append("YOUR TASK: Complement this motif - don't duplicate it, respond to it.")
-    user_prompt_parts.append("")
+    user_prompt_parts.extend(("", MOTIF_ROLE_TASKS.get(current_role_lower, DEFAULT_MOTIF_ROLE_TASK), ""))
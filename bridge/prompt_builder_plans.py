@@ -1,29 +1,134 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, List, Tuple
 
 try:
     from constants import DEFAULT_PITCH
-    from context_builder import analyze_harmony_progression, build_context_summary, get_quarters_per_bar
-    from models import ArrangeRequest, GenerateRequest
+    from context_builder import analyze_harmony_progression, build_context_summary
+    from models import ArrangeRequest, EnsembleInstrument, GenerateRequest
     from music_theory import pitch_to_note
     from prompt_builder_sketch import format_sketch_cc_segments, format_sketch_notes
-    from prompt_builder_utils import MIN_BARS_COUNT, UNKNOWN_VALUE, normalize_text
+    from prompt_builder_utils import UNKNOWN_VALUE, get_selection_bars, normalize_text
     from promts import ARRANGEMENT_PLAN_SYSTEM_PROMPT, COMPOSITION_PLAN_SYSTEM_PROMPT
     from text_utils import fix_mojibake
 except ImportError:
     from .constants import DEFAULT_PITCH
-    from .context_builder import analyze_harmony_progression, build_context_summary, get_quarters_per_bar
-    from .models import ArrangeRequest, GenerateRequest
+    from .context_builder import analyze_harmony_progression, build_context_summary
+    from .models import ArrangeRequest, EnsembleInstrument, GenerateRequest
     from .music_theory import pitch_to_note
     from .prompt_builder_sketch import format_sketch_cc_segments, format_sketch_notes
-    from .prompt_builder_utils import MIN_BARS_COUNT, UNKNOWN_VALUE, normalize_text
+    from .prompt_builder_utils import UNKNOWN_VALUE, get_selection_bars, normalize_text
     from .promts import ARRANGEMENT_PLAN_SYSTEM_PROMPT, COMPOSITION_PLAN_SYSTEM_PROMPT
     from .text_utils import fix_mojibake
 
 UNKNOWN_LABEL = "Unknown"
 DESCRIPTION_MAX_LEN = 100
 MUSICAL_LENGTH_PRECISION = 1
+PLAN_INSTRUMENTS_CACHE_SIZE = 64
+EMPTY_INSTRUMENT_RANGE = MappingProxyType({})
+
+COMPOSITION_PLAN_HEADER = "\n".join([
+    "## COMPOSITION PLAN",
+    "Create a detailed musical blueprint for this multi-instrument piece.",
+    "",
+    "### MUSICAL CONTEXT",
+])
+ARRANGEMENT_PLAN_HEADER = "\n".join([
+    "## ARRANGEMENT PLAN",
+    "Analyze this piano sketch and create an orchestration plan.",
+    "",
+    "### SOURCE SKETCH",
+])
+ENSEMBLE_TO_ORCHESTRATE_HEADER = "\n".join([
+    "",
+    "### ENSEMBLE TO ORCHESTRATE",
+    "Assign roles and plan how these instruments will work together:",
+    "",
+])
+TARGET_INSTRUMENTS_HEADER = "\n".join([
+    "",
+    "### TARGET INSTRUMENTS (to arrange for)",
+    "Decide how to distribute the sketch material among these instruments:",
+    "",
+])
+PLAN_USER_REQUEST_HEADER = "\n### USER REQUEST (this is the main creative direction)"
+PLAN_USER_REQUEST_FOOTER = "\nInterpret the user's request and plan a composition that fulfills their vision."
+ARRANGE_USER_REQUEST_HEADER = "\n### USER REQUEST (style guidance for the arrangement)"
+PLAN_OUTPUT_HEADER = "\n### OUTPUT (valid JSON only):"
+ARRANGEMENT_TASKS_BLOCK = "\n".join([
+    "",
+    "### ARRANGEMENT TASKS",
+    "1. ANALYZE the sketch - identify melody, harmony, bass, rhythm layers",
+    "2. ASSIGN each layer to appropriate instrument(s)",
+    "3. Specify VERBATIM LEVEL: how closely each instrument follows the original",
+    "4. Order instruments for GENERATION (melody first, then bass, then harmony...)",
+])
+PLANNING_TASKS_BLOCK = "\n".join([
+    "",
+    "PLANNING TASKS:",
+    "1. Assign ROLE to each instrument (melody/bass/harmony/rhythm/countermelody/pad)",
+    "   - Include instrument_index and instrument name in role_guidance",
+    "   - Provide register + guidance + relationship for each instrument",
+    "2. Define REGISTER allocation to avoid clashes",
+    "3. Plan HARMONIC framework (chord progression style)",
+    "4. Describe MOTIF or musical idea to develop",
+    "5. Order instruments by GENERATION PRIORITY (bass/rhythm first, melody second, etc.)",
+])
+PLAN_TEMPO_CONTROL_BLOCK = "\n".join([
+    "",
+    "### TEMPO/TIME SIGNATURE CONTROL",
+    "You have FULL control over tempo and time signature if the user request implies it.",
+    "Set initial_bpm and time_sig accordingly. These will be applied after all parts.",
+])
+
+
+def get_plan_instrument_signature(inst: EnsembleInstrument, include_description: bool) -> Tuple[Any, ...]:
+    range_info = inst.range or EMPTY_INSTRUMENT_RANGE
+    description = inst.description if include_description else ""
+    return (
+        inst.index,
+        inst.track_name or "",
+        inst.profile_name or "",
+        inst.family or UNKNOWN_VALUE,
+        tuple(map(str, range_info.get("preferred") or ())),
+        description[:DESCRIPTION_MAX_LEN] if description else "",
+    )
+
+
+def format_plan_instrument(
+    index: int,
+    track: str,
+    profile_name: str,
+    family: str,
+    preferred_range: Tuple[Any, ...],
+    description: str,
+) -> str:
+    if track and profile_name and track != profile_name:
+        name = f"{track} ({profile_name})"
+    else:
+        name = track or profile_name or UNKNOWN_LABEL
+
+    if preferred_range:
+        detail = f"family: {family}, range: {preferred_range[0]}-{preferred_range[1]}"
+    else:
+        detail = f"family: {family}"
+    line = f"- {index}. **{name}** ({detail})"
+    if description:
+        return f"{line}\n    Description: {description}"
+    return line
+
+
+@lru_cache(maxsize=PLAN_INSTRUMENTS_CACHE_SIZE)
+def render_plan_instruments(signatures: Tuple[Tuple[Any, ...], ...]) -> str:
+    return "\n".join(format_plan_instrument(*signature) for signature in signatures)
+
+
+def build_plan_instruments(instruments: List[EnsembleInstrument], include_description: bool) -> str:
+    return render_plan_instruments(
+        tuple(get_plan_instrument_signature(inst, include_description) for inst in instruments)
+    )
 
 
 def build_plan_prompt(request: GenerateRequest, length_q: float) -> Tuple[str, str]:
@@ -36,88 +141,40 @@ def build_plan_prompt(request: GenerateRequest, length_q: float) -> Tuple[str, s
     if final_key == UNKNOWN_VALUE and detected_key != UNKNOWN_VALUE:
         final_key = detected_key
 
-    quarters_per_bar = get_quarters_per_bar(request.music.time_sig)
-    bars = max(MIN_BARS_COUNT, int(length_q / quarters_per_bar))
+    _quarters_per_bar, bars = get_selection_bars(request.music.time_sig, length_q)
 
-    user_prompt_parts = [
-        "## COMPOSITION PLAN",
-        "Create a detailed musical blueprint for this multi-instrument piece.",
-        "",
-        "### MUSICAL CONTEXT",
-        f"- Key: {final_key}",
-        f"- Tempo: {request.music.bpm} BPM, Time: {request.music.time_sig}",
-        f"- Length: {bars} bars ({round(length_q, MUSICAL_LENGTH_PRECISION)} quarter notes)",
-    ]
-
-    if context_summary:
-        user_prompt_parts.append("")
-        user_prompt_parts.append(context_summary)
-
-    if request.ensemble and request.ensemble.instruments:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("### ENSEMBLE TO ORCHESTRATE")
-        user_prompt_parts.append("Assign roles and plan how these instruments will work together:")
-        user_prompt_parts.append("")
-
-        for inst in request.ensemble.instruments:
-            track = inst.track_name or ""
-            profile_name = inst.profile_name or ""
-            if track and profile_name and track != profile_name:
-                name = f"{track} ({profile_name})"
-            else:
-                name = track or profile_name or UNKNOWN_LABEL
-            family = inst.family or UNKNOWN_VALUE
-            description = inst.description or ""
-            range_info = inst.range or {}
-            preferred_range = range_info.get("preferred", [])
-
-            detail_parts = [f"family: {family}"]
-            if preferred_range:
-                detail_parts.append(f"range: {preferred_range[0]}-{preferred_range[1]}")
-            detail = ", ".join(detail_parts)
-
-            user_prompt_parts.append(f"- {inst.index}. **{name}** ({detail})")
-            if description:
-                user_prompt_parts.append(f"    Description: {description[:DESCRIPTION_MAX_LEN]}")
-
-        user_prompt_parts.append("")
-        user_prompt_parts.append("PLANNING TASKS:")
-        user_prompt_parts.append("1. Assign ROLE to each instrument (melody/bass/harmony/rhythm/countermelody/pad)")
-        user_prompt_parts.append("   - Include instrument_index and instrument name in role_guidance")
-        user_prompt_parts.append("   - Provide register + guidance + relationship for each instrument")
-        user_prompt_parts.append("2. Define REGISTER allocation to avoid clashes")
-        user_prompt_parts.append("3. Plan HARMONIC framework (chord progression style)")
-        user_prompt_parts.append("4. Describe MOTIF or musical idea to develop")
-        user_prompt_parts.append("5. Order instruments by GENERATION PRIORITY (bass/rhythm first, melody second, etc.)")
-
-        if request.allow_tempo_changes:
-            user_prompt_parts.append("")
-            user_prompt_parts.append("### TEMPO/TIME SIGNATURE CONTROL")
-            user_prompt_parts.append("You have FULL control over tempo and time signature if the user request implies it.")
-            user_prompt_parts.append("Set initial_bpm and time_sig accordingly. These will be applied after all parts.")
+    has_ensemble = bool(request.ensemble and request.ensemble.instruments)
+    ensemble_section = None
+    if has_ensemble:
+        ensemble_section = "\n".join((
+            ENSEMBLE_TO_ORCHESTRATE_HEADER,
+            build_plan_instruments(request.ensemble.instruments, True),
+            PLANNING_TASKS_BLOCK,
+        ))
 
     user_prompt_text = normalize_text(fix_mojibake(request.user_prompt))
+    request_section = None
     if user_prompt_text:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("### USER REQUEST (this is the main creative direction)")
-        user_prompt_parts.append(user_prompt_text)
-        user_prompt_parts.append("")
-        user_prompt_parts.append("Interpret the user's request and plan a composition that fulfills their vision.")
+        request_section = "\n".join((PLAN_USER_REQUEST_HEADER, user_prompt_text, PLAN_USER_REQUEST_FOOTER))
 
-    user_prompt_parts.extend([
-        "",
-        "### OUTPUT (valid JSON only):",
-    ])
-
-    user_prompt = "\n".join(user_prompt_parts)
+    user_prompt = "\n".join(filter(None, (
+        COMPOSITION_PLAN_HEADER,
+        f"- Key: {final_key}",
+        f"- Tempo: {request.music.bpm} BPM, Time: {request.music.time_sig}",
+        f"- Length: {bars} bars ({round(length_q, MUSICAL_LENGTH_PRECISION)} quarter notes)",
+        "\n" + context_summary if context_summary else None,
+        ensemble_section,
+        PLAN_TEMPO_CONTROL_BLOCK if has_ensemble and request.allow_tempo_changes else None,
+        request_section,
+        PLAN_OUTPUT_HEADER,
+    )))
     return system_prompt, user_prompt
 
 
 def build_arrange_plan_prompt(request: ArrangeRequest, length_q: float) -> Tuple[str, str]:
     system_prompt = ARRANGEMENT_PLAN_SYSTEM_PROMPT
 
-    quarters_per_bar = get_quarters_per_bar(request.music.time_sig)
-    bars = max(MIN_BARS_COUNT, int(length_q / quarters_per_bar))
+    _quarters_per_bar, bars = get_selection_bars(request.music.time_sig, length_q)
 
     sketch_notes = request.source_sketch.notes if request.source_sketch else []
     sketch_track_name = request.source_sketch.track_name if request.source_sketch else UNKNOWN_LABEL
@@ -136,11 +193,8 @@ def build_arrange_plan_prompt(request: ArrangeRequest, length_q: float) -> Tuple
     if not harmony_progression:
         harmony_progression = "(no chord changes detected)"
 
-    user_prompt_parts = [
-        "## ARRANGEMENT PLAN",
-        "Analyze this piano sketch and create an orchestration plan.",
-        "",
-        "### SOURCE SKETCH",
+    sketch_section = "\n".join((
+        ARRANGEMENT_PLAN_HEADER,
         f"Track: {sketch_track_name}",
         f"Total notes: {len(sketch_notes)}",
         f"Pitch range: {pitch_to_note(min_pitch)} to {pitch_to_note(max_pitch)} (MIDI {min_pitch}-{max_pitch})",
@@ -161,49 +215,25 @@ def build_arrange_plan_prompt(request: ArrangeRequest, length_q: float) -> Tuple
         f"- Key: {request.music.key} (project setting) / {detected_key} (detected from sketch)",
         f"- Tempo: {request.music.bpm} BPM, Time: {request.music.time_sig}",
         f"- Length: {bars} bars ({round(length_q, MUSICAL_LENGTH_PRECISION)} quarter notes)",
-    ]
+    ))
 
+    target_section = None
     if request.target_instruments:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("### TARGET INSTRUMENTS (to arrange for)")
-        user_prompt_parts.append("Decide how to distribute the sketch material among these instruments:")
-        user_prompt_parts.append("")
-
-        for inst in request.target_instruments:
-            track = inst.track_name or ""
-            profile_name = inst.profile_name or ""
-            if track and profile_name and track != profile_name:
-                name = f"{track} ({profile_name})"
-            else:
-                name = track or profile_name or UNKNOWN_LABEL
-            family = inst.family or UNKNOWN_VALUE
-            range_info = inst.range or {}
-            preferred_range = range_info.get("preferred", [])
-
-            detail_parts = [f"family: {family}"]
-            if preferred_range:
-                detail_parts.append(f"range: {preferred_range[0]}-{preferred_range[1]}")
-            detail = ", ".join(detail_parts)
-
-            user_prompt_parts.append(f"- {inst.index}. **{name}** ({detail})")
-
-    user_prompt_parts.append("")
-    user_prompt_parts.append("### ARRANGEMENT TASKS")
-    user_prompt_parts.append("1. ANALYZE the sketch - identify melody, harmony, bass, rhythm layers")
-    user_prompt_parts.append("2. ASSIGN each layer to appropriate instrument(s)")
-    user_prompt_parts.append("3. Specify VERBATIM LEVEL: how closely each instrument follows the original")
-    user_prompt_parts.append("4. Order instruments for GENERATION (melody first, then bass, then harmony...)")
+        target_section = "\n".join((
+            TARGET_INSTRUMENTS_HEADER,
+            build_plan_instruments(request.target_instruments, False),
+        ))
 
     user_prompt_text = normalize_text(request.user_prompt)
+    request_section = None
     if user_prompt_text:
-        user_prompt_parts.append("")
-        user_prompt_parts.append("### USER REQUEST (style guidance for the arrangement)")
-        user_prompt_parts.append(user_prompt_text)
-
-    user_prompt_parts.extend([
-        "",
-        "### OUTPUT (valid JSON only):",
-    ])
-
-    user_prompt = "\n".join(user_prompt_parts)
+        request_section = "\n".join((ARRANGE_USER_REQUEST_HEADER, user_prompt_text))
+
+    user_prompt = "\n".join(filter(None, (
+        sketch_section,
+        target_section,
+        ARRANGEMENT_TASKS_BLOCK,
+        request_section,
+        PLAN_OUTPUT_HEADER,
+    )))
     return system_prompt, user_prompt
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple
 
 try:
     from constants import (
@@ -15,8 +17,8 @@ try:
         RANGE_BOUND_COUNT,
         normalize_lower,
         normalize_text,
-        import_note_to_midi,
     )
+    from midi_utils import note_to_midi
     from utils import safe_format
 except ImportError:
     from .constants import (
@@ -31,8 +33,8 @@ except ImportError:
         RANGE_BOUND_COUNT,
         normalize_lower,
         normalize_text,
-        import_note_to_midi,
     )
+    from .midi_utils import note_to_midi
     from .utils import safe_format
 
 
@@ -46,8 +48,25 @@ DYNAMICS_TYPE_VELOCITY = "velocity"
 DEFAULT_DYNAMICS_TYPE = "cc1"
 ORCHESTRATION_LIST_LIMIT = 5
 UNKNOWN_PROFILE_PLACEHOLDER = "?"
-
-ARTICULATION_DURATION_HINTS = {
+ARTICULATION_LIST_CACHE_SIZE = 64
+PITCH_RANGE_CACHE_SIZE = 64
+PITCH_NOTE_VALUE_TYPES = (str, int, float)
+CUSTOM_CURVES_CACHE_SIZE = 64
+SHORT_ARTICULATIONS_CACHE_SIZE = 64
+LONG_ARTICULATIONS_HEADER = "LONG articulations (dynamics via Dynamics curve, use longer dur_q 1.0+):"
+SHORT_ARTICULATIONS_HEADER = "SHORT articulations (dynamics via velocity, use short dur_q as specified):"
+HINT_BULLET_PREFIX = "  - "
+HINT_BULLET_SEPARATOR = "\n" + HINT_BULLET_PREFIX
+ORCHESTRATION_HINTS_FOOTER = ("", "Note: These are recommendations. User prompt may override these suggestions.")
+ORCHESTRATION_BULLET_SECTIONS = (
+    ("best_for", "**Best suited for:**", ORCHESTRATION_LIST_LIMIT, False),
+    ("register_character", "**Register characteristics:**", None, False),
+    ("ensemble_tips", "**Ensemble tips:**", ORCHESTRATION_LIST_LIMIT, True),
+    ("texture_options", "**Texture options:**", ORCHESTRATION_LIST_LIMIT, False),
+    ("avoid", "**Avoid:**", None, False),
+)
+
+ARTICULATION_DURATION_HINTS = MappingProxyType({
     "spiccato": "dur_q: 0.25-0.5, bouncy detached",
     "staccatissimo": "dur_q: 0.125-0.25, very short crisp",
     "staccato": "dur_q: 0.25-0.5, short separated",
@@ -56,7 +75,11 @@ ARTICULATION_DURATION_HINTS = {
     "bartok_snap": "dur_q: 0.25, percussive snap",
     "sforzando": "dur_q: 0.5-1.0, accented attack",
     "marcato": "dur_q: 0.5-1.0, marked accent",
-}
+})
+
+ARTICULATION_DURATION_SUFFIXES = MappingProxyType({
+    name: f" ({hint})" for name, hint in ARTICULATION_DURATION_HINTS.items() if hint
+})
 
 
 def build_generation_progress(ensemble: Any, current_profile_name: str) -> str:
@@ -72,7 +95,7 @@ def build_generation_progress(ensemble: Any, current_profile_name: str) -> str:
         for p in previously_generated
     ]
 
-    remaining = []
+    remaining: List[str] = []
     for inst in instruments:
         inst_name = inst.profile_name or inst.track_name or ""
         if inst.index > generation_order and inst_name not in completed_names:
@@ -105,18 +128,22 @@ def format_profile_user_template(template: str, values: Dict[str, Any]) -> str:
 def get_custom_curves_info(profile: Dict[str, Any]) -> Tuple[List[str], str]:
     controllers = profile.get("controllers", {})
     semantic_to_cc = controllers.get("semantic_to_cc", controllers)
-    custom_curves = [
-        k for k in semantic_to_cc.keys()
-        if k not in CUSTOM_CURVE_EXCLUSIONS and isinstance(semantic_to_cc[k], int)
-    ]
-    if not custom_curves:
-        return custom_curves, ""
-    curves_info = ", ".join([f"curves.{k} (CC{semantic_to_cc[k]})" for k in custom_curves])
-    return custom_curves, curves_info
+    curves = tuple(
+        (k, v) for k, v in semantic_to_cc.items()
+        if k not in CUSTOM_CURVE_EXCLUSIONS and isinstance(v, int)
+    )
+    if not curves:
+        return [], ""
+    return [k for k, _v in curves], render_custom_curves_info(curves)
+
+
+@lru_cache(maxsize=CUSTOM_CURVES_CACHE_SIZE)
+def render_custom_curves_info(curves: Tuple[Tuple[str, int], ...]) -> str:
+    return ", ".join(f"curves.{name} (CC{cc})" for name, cc in curves)
 
 
 def format_profile_for_prompt(profile: Dict[str, Any]) -> str:
-    lines = []
+    lines: List[str] = []
 
     name = profile.get("name", DEFAULT_PROFILE_NAME)
     range_info = profile.get("range", {})
@@ -131,7 +158,7 @@ def format_profile_for_prompt(profile: Dict[str, Any]) -> str:
 
     controllers = profile.get("controllers", {})
     semantic_to_cc = controllers.get("semantic_to_cc", controllers)
-    cc_list = []
+    cc_list: List[str] = []
     for k, v in semantic_to_cc.items():
         if isinstance(v, int):
             cc_list.append(f"{k}=CC{v}")
@@ -196,26 +223,36 @@ def format_profile_for_prompt(profile: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
-def resolve_prompt_pitch_range(pref_range: Any) -> Tuple[int, int]:
+@lru_cache(maxsize=PITCH_RANGE_CACHE_SIZE)
+def resolve_pitch_range_bounds(low_note: Any, high_note: Any) -> Tuple[int, int]:
     pitch_low = DEFAULT_PROMPT_PITCH_LOW
     pitch_high = DEFAULT_PROMPT_PITCH_HIGH
-    if pref_range and isinstance(pref_range, list) and len(pref_range) == RANGE_BOUND_COUNT:
-        note_to_midi = import_note_to_midi()
-        try:
-            pitch_low = note_to_midi(pref_range[0])
-            pitch_high = note_to_midi(pref_range[1])
-        except ValueError:
-            pass
+    try:
+        pitch_low = note_to_midi(low_note)
+        pitch_high = note_to_midi(high_note)
+    except ValueError:
+        pass
     return pitch_low, pitch_high
 
 
+def resolve_prompt_pitch_range(pref_range: Any) -> Tuple[int, int]:
+    if pref_range and isinstance(pref_range, list) and len(pref_range) == RANGE_BOUND_COUNT:
+        low_note, high_note = (note if isinstance(note, PITCH_NOTE_VALUE_TYPES) else None for note in pref_range)
+        return resolve_pitch_range_bounds(low_note, high_note)
+    return DEFAULT_PROMPT_PITCH_LOW, DEFAULT_PROMPT_PITCH_HIGH
+
+
 def get_profile_articulation_names(profile: Dict[str, Any]) -> List[str]:
     art_cfg = profile.get("articulations", {})
     art_map = art_cfg.get("map", {})
     if not isinstance(art_map, dict):
         return []
-    names = [normalize_text(name) for name in art_map.keys() if normalize_text(name)]
-    return sorted(set(names))
+    return list(sort_articulation_names(tuple(art_map)))
+
+
+@lru_cache(maxsize=ARTICULATION_LIST_CACHE_SIZE)
+def sort_articulation_names(names: Tuple[Any, ...]) -> Tuple[str, ...]:
+    return tuple(sorted({normalized for normalized in map(normalize_text, names) if normalized}))
 
 
 def resolve_profile_default_articulation(
@@ -243,64 +280,65 @@ def resolve_prompt_articulation(profile: Dict[str, Any], preset_settings: Dict[s
     return resolve_profile_default_articulation(profile, allowed_map, allowed_names)
 
 
+@lru_cache(maxsize=SHORT_ARTICULATIONS_CACHE_SIZE)
+def get_short_articulation_names(short_articulations: Tuple[Any, ...]) -> FrozenSet[str]:
+    return frozenset(normalize_lower(name) for name in short_articulations)
+
+
+def is_short_articulation(profile: Dict[str, Any], articulation: str) -> bool:
+    if not articulation:
+        return False
+    short_articulations = profile.get("articulations", {}).get("short_articulations", [])
+    if not short_articulations:
+        return False
+    return normalize_lower(articulation) in get_short_articulation_names(tuple(short_articulations))
+
+
+def format_hint_bullets(items: Iterable[Any]) -> str:
+    return HINT_BULLET_PREFIX + HINT_BULLET_SEPARATOR.join(map(str, items))
+
+
 def build_orchestration_hints_prompt(profile: Dict[str, Any], is_ensemble: bool = False) -> str:
     hints = profile.get("orchestration_hints", {})
     if not hints:
         return ""
 
+    get = hints.get
     lines = ["### ORCHESTRATION GUIDANCE (recommendations for this instrument)"]
 
-    character = hints.get("character", "")
+    character = get("character", "")
     if character:
         lines.append(f"**Character:** {character}")
 
-    typical_roles = hints.get("typical_roles", [])
+    typical_roles = get("typical_roles", [])
     if typical_roles:
         lines.append(f"**Typical roles:** {', '.join(typical_roles)}")
 
-    best_for = hints.get("best_for", [])
-    if best_for:
-        lines.append("**Best suited for:**")
-        for item in best_for[:ORCHESTRATION_LIST_LIMIT]:
-            lines.append(f"  - {item}")
-
-    register_char = hints.get("register_character", {})
-    if register_char:
-        lines.append("**Register characteristics:**")
-        for reg, desc in register_char.items():
-            lines.append(f"  - {reg}: {desc}")
-
-    if is_ensemble:
-        ensemble_tips = hints.get("ensemble_tips", [])
-        if ensemble_tips:
-            lines.append("**Ensemble tips:**")
-            for tip in ensemble_tips[:ORCHESTRATION_LIST_LIMIT]:
-                lines.append(f"  - {tip}")
-
-    texture_options = hints.get("texture_options", [])
-    if texture_options:
-        lines.append("**Texture options:**")
-        for option in texture_options[:ORCHESTRATION_LIST_LIMIT]:
-            lines.append(f"  - {option}")
-
-    avoid = hints.get("avoid", [])
-    if avoid:
-        lines.append("**Avoid:**")
-        for item in avoid:
-            lines.append(f"  - {item}")
-
-    solo_mode = hints.get("solo_mode", {})
-    if solo_mode and not is_ensemble:
+    for key, header, limit, ensemble_only in ORCHESTRATION_BULLET_SECTIONS:
+        if ensemble_only and not is_ensemble:
+            continue
+        items = get(key)
+        if not items:
+            continue
+        if isinstance(items, dict):
+            items = [f"{name}: {desc}" for name, desc in items.items()]
+        lines.append(header)
+        lines.append(format_hint_bullets(items[:limit]))
+
+    solo_mode = {} if is_ensemble else get("solo_mode", {})
+    if solo_mode:
         lines.append("**Solo mode guidance:**")
-        if solo_mode.get("description"):
-            lines.append(f"  {solo_mode['description']}")
-        if solo_mode.get("left_hand"):
-            lines.append(f"  LEFT HAND: {solo_mode['left_hand']}")
-        if solo_mode.get("right_hand"):
-            lines.append(f"  RIGHT HAND: {solo_mode['right_hand']}")
-
-    lines.append("")
-    lines.append("Note: These are recommendations. User prompt may override these suggestions.")
+        description = solo_mode.get("description")
+        if description:
+            lines.append(f"  {description}")
+        left_hand = solo_mode.get("left_hand")
+        if left_hand:
+            lines.append(f"  LEFT HAND: {left_hand}")
+        right_hand = solo_mode.get("right_hand")
+        if right_hand:
+            lines.append(f"  RIGHT HAND: {right_hand}")
+
+    lines.extend(ORCHESTRATION_HINTS_FOOTER)
 
     return "\n".join(lines)
 
@@ -311,27 +349,27 @@ def build_articulation_list_for_prompt(profile: Dict[str, Any]) -> str:
     if not art_map:
         return "No articulations available"
 
-    short_arts = []
-    long_arts = []
-
-    for name, data in sorted(art_map.items()):
-        desc = data.get("description", name)
-        dynamics_type = data.get("dynamics", DEFAULT_DYNAMICS_TYPE)
-        dur_hint = ARTICULATION_DURATION_HINTS.get(name, "")
-        if dynamics_type == DYNAMICS_TYPE_VELOCITY:
-            if dur_hint:
-                short_arts.append(f"  - {name}: {desc} ({dur_hint})")
-            else:
-                short_arts.append(f"  - {name}: {desc}")
-        else:
-            long_arts.append(f"  - {name}: {desc}")
-
-    result_parts = []
-    if long_arts:
-        result_parts.append("LONG articulations (dynamics via Dynamics curve, use longer dur_q 1.0+):")
-        result_parts.extend(long_arts)
-    if short_arts:
-        result_parts.append("SHORT articulations (dynamics via velocity, use short dur_q as specified):")
-        result_parts.extend(short_arts)
-
-    return "\n".join(result_parts)
+    entries = tuple(
+        format_articulation_entry(name, data.get("description", name), data.get("dynamics", DEFAULT_DYNAMICS_TYPE))
+        for name, data in art_map.items()
+    )
+    return render_articulation_list(entries)
+
+
+def format_articulation_entry(name: str, desc: Any, dynamics_type: Any) -> Tuple[str, bool, str]:
+    if dynamics_type == DYNAMICS_TYPE_VELOCITY:
+        return name, True, f"  - {name}: {desc}{ARTICULATION_DURATION_SUFFIXES.get(name, '')}"
+    return name, False, f"  - {name}: {desc}"
+
+
+@lru_cache(maxsize=ARTICULATION_LIST_CACHE_SIZE)
+def render_articulation_list(entries: Tuple[Tuple[str, bool, str], ...]) -> str:
+    long_lines: List[str] = []
+    short_lines: List[str] = []
+    for _name, is_short, line in sorted(entries):
+        (short_lines if is_short else long_lines).append(line)
+
+    return "\n".join(filter(None, (
+        "\n".join((LONG_ARTICULATIONS_HEADER, *long_lines)) if long_lines else "",
+        "\n".join((SHORT_ARTICULATIONS_HEADER, *short_lines)) if short_lines else "",
+    )))
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from constants import (
@@ -51,6 +53,19 @@ DEFAULT_MATERIAL_SOURCE = "Extract appropriate material from sketch"
 DEFAULT_ADAPTATION_NOTES = "Adapt to instrument idiom"
 DEFAULT_VERBATIM_LEVEL = "medium"
 DEFAULT_REGISTER_ADJUSTMENT = "none"
+DEFAULT_ASSIGNMENT_FINGERPRINT = (
+    DEFAULT_ARRANGEMENT_ROLE,
+    DEFAULT_MATERIAL_SOURCE,
+    DEFAULT_ADAPTATION_NOTES,
+    DEFAULT_VERBATIM_LEVEL,
+    DEFAULT_REGISTER_ADJUSTMENT,
+)
+DEFAULT_ARRANGEMENT_CONTEXT_CACHE_LIMIT = 32
+SKETCH_NOTE_KEY_FIELDS = ("start_q", "dur_q", "pitch", "vel", "chan")
+SKETCH_CC_KEY_FIELDS = ("time_q", "start_q", "cc", "controller", "value", "val", "chan")
+
+_default_arrangement_context_cache: OrderedDict[Tuple[Any, ...], str] = OrderedDict()
+_default_arrangement_context_lock = Lock()
 
 
 def format_sketch_notes(
@@ -79,9 +94,8 @@ def format_sketch_notes(
         note_name = pitch_to_note(pitch)
         bar = int(float(start_q) // quarters_per_bar) + DEFAULT_BAR_INDEX if quarters_per_bar > 0 else DEFAULT_BAR_INDEX
         beat_q = (float(start_q) % quarters_per_bar) + DEFAULT_BEAT_OFFSET if quarters_per_bar > 0 else DEFAULT_BEAT_OFFSET
-        bar_beat = f"{bar}.{beat_q:.2f}"
         lines.append(
-            f"{float(start_q):6.2f} | {bar_beat:8} | {int(pitch):5} | {note_name:4} | {float(dur_q):5.2f} | {int(vel):3} | {int(chan):3}"
+            f"{float(start_q):6.2f} | {bar:>3}.{beat_q:<4.2f} | {int(pitch):5} | {note_name:4} | {float(dur_q):5.2f} | {int(vel):3} | {int(chan):3}"
         )
 
     lines.append("```")
@@ -99,7 +113,7 @@ def format_sketch_notes_compact(notes: List[Dict[str, Any]], limit: int = SKETCH
     sorted_notes = sorted(notes, key=lambda n: n.get("start_q", DEFAULT_START_Q))
     limited = sorted_notes[:limit]
 
-    entries = []
+    entries: List[str] = []
     for note in limited:
         start_q = note.get("start_q", DEFAULT_START_Q)
         pitch = note.get("pitch", DEFAULT_PITCH)
@@ -200,7 +214,88 @@ def build_arrangement_context(
     material_source = assignment.get("material_source", DEFAULT_MATERIAL_SOURCE)
     adaptation_notes = assignment.get("adaptation_notes", DEFAULT_ADAPTATION_NOTES)
     verbatim_level = assignment.get("verbatim_level", DEFAULT_VERBATIM_LEVEL)
-    register_adjustment = assignment.get("register_adjustment", DEFAULT_REGISTER_ADJUSTMENT)
+    register_adjustment = assignment.get("register_adjustment", DEFAULT_REGISTER_ADJUSTMENT) or DEFAULT_REGISTER_ADJUSTMENT
+
+    assignment_fingerprint = (role, material_source, adaptation_notes, verbatim_level, register_adjustment)
+    if assignment_fingerprint != DEFAULT_ASSIGNMENT_FINGERPRINT:
+        return render_arrangement_context(
+            sketch_track_name,
+            sketch_notes,
+            sketch_cc_events,
+            assignment_fingerprint,
+            time_sig,
+            length_q,
+        )
+
+    cache_key = build_sketch_cache_key(sketch_track_name, sketch_notes, sketch_cc_events, time_sig, length_q)
+    if cache_key is None:
+        return render_arrangement_context(
+            sketch_track_name,
+            sketch_notes,
+            sketch_cc_events,
+            assignment_fingerprint,
+            time_sig,
+            length_q,
+        )
+
+    with _default_arrangement_context_lock:
+        cached = _default_arrangement_context_cache.get(cache_key)
+        if cached is not None:
+            _default_arrangement_context_cache.move_to_end(cache_key)
+            return cached
+
+    context = render_arrangement_context(
+        sketch_track_name,
+        sketch_notes,
+        sketch_cc_events,
+        assignment_fingerprint,
+        time_sig,
+        length_q,
+    )
+    with _default_arrangement_context_lock:
+        _default_arrangement_context_cache[cache_key] = context
+        _default_arrangement_context_cache.move_to_end(cache_key)
+        while len(_default_arrangement_context_cache) > DEFAULT_ARRANGEMENT_CONTEXT_CACHE_LIMIT:
+            _default_arrangement_context_cache.popitem(last=False)
+    return context
+
+
+def build_sketch_item_key(item: Any, fields: Tuple[str, ...]) -> Any:
+    return tuple(item.get(field) for field in fields) if isinstance(item, dict) else item
+
+
+def build_sketch_cache_key(
+    sketch_track_name: str,
+    sketch_notes: Any,
+    sketch_cc_events: Any,
+    time_sig: str,
+    length_q: float,
+) -> Optional[Tuple[Any, ...]]:
+    if not isinstance(sketch_notes, list) or not isinstance(sketch_cc_events, list):
+        return None
+    cache_key = (
+        sketch_track_name,
+        tuple(build_sketch_item_key(note, SKETCH_NOTE_KEY_FIELDS) for note in sketch_notes),
+        tuple(build_sketch_item_key(evt, SKETCH_CC_KEY_FIELDS) for evt in sketch_cc_events),
+        time_sig,
+        length_q,
+    )
+    try:
+        hash(cache_key)
+    except TypeError:
+        return None
+    return cache_key
+
+
+def render_arrangement_context(
+    sketch_track_name: str,
+    sketch_notes: Any,
+    sketch_cc_events: Any,
+    assignment_fingerprint: Tuple[Any, ...],
+    time_sig: str,
+    length_q: float,
+) -> str:
+    role, material_source, adaptation_notes, verbatim_level, register_adjustment = assignment_fingerprint
 
     quarters_per_bar = get_quarters_per_bar(time_sig)
     max_dur_by_bars_q = quarters_per_bar * ARRANGEMENT_MAX_NOTE_DUR_BARS
@@ -225,7 +320,7 @@ def build_arrangement_context(
         length_q,
     )
 
-    context = ARRANGEMENT_GENERATION_CONTEXT.format(
+    return ARRANGEMENT_GENERATION_CONTEXT.format(
         source_track_name=sketch_track_name,
         note_count=len(sketch_notes),
         sketch_notes_formatted=format_sketch_notes(sketch_notes, time_sig),
@@ -237,7 +332,5 @@ def build_arrangement_context(
         material_source=material_source,
         adaptation_notes=adaptation_notes,
         verbatim_level=verbatim_level,
-        register_adjustment=register_adjustment or DEFAULT_REGISTER_ADJUSTMENT,
+        register_adjustment=register_adjustment,
     )
-
-    return context
@@ -28,8 +28,10 @@ try:
         bar_to_time_q,
         bars_range_to_time_q,
         estimate_note_count,
+        estimate_selection_note_count,
         extract_key_from_chord_map,
         get_chord_tones_from_name,
+        get_selection_bars,
         infer_key_from_plan_chord_map,
         parse_chord_root,
         split_time_signature,
@@ -43,6 +45,7 @@ try:
         format_profile_user_template,
         get_custom_curves_info,
         get_profile_articulation_names,
+        is_short_articulation,
         resolve_profile_default_articulation,
         resolve_prompt_articulation,
         resolve_prompt_pitch_range,
@@ -75,8 +78,10 @@ except ImportError:
         bar_to_time_q,
         bars_range_to_time_q,
         estimate_note_count,
+        estimate_selection_note_count,
         extract_key_from_chord_map,
         get_chord_tones_from_name,
+        get_selection_bars,
         infer_key_from_plan_chord_map,
         parse_chord_root,
         split_time_signature,
@@ -90,6 +95,7 @@ except ImportError:
         format_profile_user_template,
         get_custom_curves_info,
         get_profile_articulation_names,
+        is_short_articulation,
         resolve_profile_default_articulation,
         resolve_prompt_articulation,
         resolve_prompt_pitch_range,
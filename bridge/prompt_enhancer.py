@@ -3,10 +3,8 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 
 try:
-    from logger_config import logger
     from text_utils import fix_mojibake
 except ImportError:
-    from .logger_config import logger
     from .text_utils import fix_mojibake
 
 
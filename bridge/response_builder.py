@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import re
 
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from bisect import bisect_right
 
@@ -33,9 +34,7 @@ try:
         TIME_SIG_VALID_DENOM,
         WIND_BRASS_FAMILIES,
         WIND_BRASS_MAX_NOTE_DUR_Q,
-        STRINGS_MAX_NOTE_DUR_Q,
         STRINGS_FAMILIES,
-        MAX_NOTE_DUR_Q_DEFAULT,
         ARRANGEMENT_MAX_NOTE_DUR_BARS,
     )
     from context_builder import generate_synthetic_handoff, get_quarters_per_bar, validate_and_fix_handoff
@@ -46,6 +45,7 @@ try:
         normalize_drums,
         normalize_notes,
         note_to_midi,
+        parse_duration,
         parse_range,
     )
     from music_analysis import extract_motif_from_notes
@@ -73,9 +73,7 @@ except ImportError:
         TIME_SIG_VALID_DENOM,
         WIND_BRASS_FAMILIES,
         WIND_BRASS_MAX_NOTE_DUR_Q,
-        STRINGS_MAX_NOTE_DUR_Q,
         STRINGS_FAMILIES,
-        MAX_NOTE_DUR_Q_DEFAULT,
         ARRANGEMENT_MAX_NOTE_DUR_BARS,
     )
     from .context_builder import generate_synthetic_handoff, get_quarters_per_bar, validate_and_fix_handoff
@@ -86,6 +84,7 @@ except ImportError:
         normalize_drums,
         normalize_notes,
         note_to_midi,
+        parse_duration,
         parse_range,
     )
     from .music_analysis import extract_motif_from_notes
@@ -113,6 +112,7 @@ NOTE_NAME_RE = re.compile(r"\b([A-Ga-g])([#b]?)\b")
 MIN_PER_NOTE_DYNAMICS_POINTS = 3
 LONG_NOTE_DYNAMICS_POINTS = 4
 BREAKPOINT_NEAR_WINDOW_Q = 0.02
+SHORT_ARTICULATIONS_CACHE_SIZE = 64
 
 
 def smooth_breakpoint_transitions(breakpoints: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -763,19 +763,24 @@ def user_requests_articulation_change(user_prompt: str, profile: Dict[str, Any])
     return False
 
 
-def get_short_articulations(profile: Dict[str, Any]) -> set[str]:
+def get_short_articulations(profile: Dict[str, Any]) -> FrozenSet[str]:
     art_cfg = profile.get("articulations", {})
     short_list = art_cfg.get("short_articulations") or []
     if short_list:
-        return {str(name).lower() for name in short_list}
+        return lower_articulation_names(tuple(short_list))
     art_map = art_cfg.get("map", {})
     if not isinstance(art_map, dict):
-        return set()
-    return {
-        name.lower()
+        return frozenset()
+    return lower_articulation_names(tuple(
+        name
         for name, data in art_map.items()
         if isinstance(data, dict) and data.get("dynamics") == "velocity"
-    }
+    ))
+
+
+@lru_cache(maxsize=SHORT_ARTICULATIONS_CACHE_SIZE)
+def lower_articulation_names(names: Tuple[Any, ...]) -> FrozenSet[str]:
+    return frozenset(str(name).lower() for name in names)
 
 
 def clamp_wind_brass_durations(notes: List[Dict[str, Any]], profile: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -1074,11 +1079,6 @@ def rearticulate_long_notes(
 
 
 def expand_pattern_notes(raw: Dict[str, Any], time_sig: str = "4/4") -> List[Dict[str, Any]]:
-    try:
-        from midi_utils import bar_beat_to_start_q, parse_duration
-    except ImportError:
-        from .midi_utils import bar_beat_to_start_q, parse_duration
-    
     patterns = raw.get("patterns", [])
     repeats = raw.get("repeats", [])
     if not isinstance(patterns, list) or not isinstance(repeats, list):
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Iterable
 
 
@@ -18,6 +19,7 @@ MOJIBAKE_MARKERS: Iterable[str] = (
     "\u009d",  # control
     "\ufffd",  # replacement
 )
+MOJIBAKE_CACHE_SIZE = 128
 
 
 def _marker_score(text: str) -> int:
@@ -35,6 +37,11 @@ def _looks_mojibake(text: str) -> bool:
 def fix_mojibake(text: str) -> str:
     if not isinstance(text, str):
         return str(text or "")
+    return _fix_mojibake_text(text)
+
+
+@lru_cache(maxsize=MOJIBAKE_CACHE_SIZE)
+def _fix_mojibake_text(text: str) -> str:
     if not _looks_mojibake(text):
         return text
 
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Tuple
 
 try:
     from constants import LOG_PREVIEW_CHARS
@@ -9,20 +10,55 @@ except ImportError:
     from .constants import LOG_PREVIEW_CHARS
 
 PLACEHOLDER_PATTERN = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
+TEMPLATE_CACHE_SIZE = 128
 
 
 def clamp(value: float, low: float, high: float) -> float:
     return max(low, min(high, value))
 
 
-def safe_format(template: str, values: Dict[str, Any]) -> str:
-    def replacer(match: re.Match) -> str:
-        key = match.group(1)
-        if key in values:
-            return str(values[key])
-        return match.group(0)
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(template: str) -> Tuple[Tuple[str, str], ...]:
+    segments = []
+    pos = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template):
+        segments.append((template[pos:match.start()], match.group(1)))
+        pos = match.end()
+    segments.append((template[pos:], ""))
+    return tuple(segments)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def get_template_fields(template: str) -> FrozenSet[str]:
+    return frozenset(key for _literal, key in compile_template(template) if key)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_format_template(template: str) -> str:
+    parts = []
+    for literal, key in compile_template(template):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if key:
+            parts.append(f"{{{key}!s}}")
+    return "".join(parts)
+
 
-    return PLACEHOLDER_PATTERN.sub(replacer, template)
+class TemplateValues:
+    __slots__ = ("values",)
+
+    def __init__(self, values: Dict[str, Any]) -> None:
+        self.values = values
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.values:
+            return self.values[key]
+        return f"{{{key}}}"
+
+
+def safe_format(template: str, values: Dict[str, Any]) -> str:
+    if not get_template_fields(template):
+        return template
+    return compile_format_template(template).format_map(TemplateValues(values))
 
 
 def summarize_text(text: str, limit: int = LOG_PREVIEW_CHARS) -> str: